@@ -0,0 +1,55 @@
+import asyncio
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+import pytest
+
+from pyecoforest.const import (
+    API_ALARMS_OP,
+    API_SET_POWER_OP,
+    API_SET_STATE_OP,
+    API_SET_TEMP_OP,
+    API_STATS_OP,
+    API_STATUS_OP,
+)
+from pyecoforest.parser import parse
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+REPLIES = {
+    str(API_STATUS_OP): (FIXTURES / "op-1002-status.txt").read_bytes(),
+    str(API_STATS_OP): (FIXTURES / "op-1020-stats.txt").read_bytes(),
+    str(API_ALARMS_OP): (FIXTURES / "op-1079-alarms.txt").read_bytes(),
+    str(API_SET_POWER_OP): (FIXTURES / "op-1004-set-power.txt").read_bytes(),
+    str(API_SET_STATE_OP): (FIXTURES / "op-1013-set-state.txt").read_bytes(),
+    str(API_SET_TEMP_OP): (FIXTURES / "op-1019-set-temp.txt").read_bytes(),
+}
+
+
+@pytest.fixture()
+def data() -> dict[str, dict[str, str]]:
+    """Return the parsed status, stats and alarms replies."""
+    return {
+        "status": parse(REPLIES[str(API_STATUS_OP)]),
+        "stats": parse(REPLIES[str(API_STATS_OP)]),
+        "alarms": parse(REPLIES[str(API_ALARMS_OP)]),
+    }
+
+
+@pytest.fixture()
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    """Return an event loop to run the async code being measured."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture()
+def transport() -> httpx.MockTransport:
+    """Return a transport answering every operation with its fixture."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        operation = request.content.decode().split("&")[0].split("=")[1]
+        return httpx.Response(200, content=REPLIES[operation])
+
+    return httpx.MockTransport(handler)
@@ -0,0 +1,66 @@
+"""
+Reference implementations the benchmarks compare against.
+
+They are the previous string based parser, unslotted model and enum
+builders, kept so their cost can be measured next to the current ones.
+"""
+import dataclasses
+
+from pyecoforest.models.device import Alarm, Device, OperationMode, State
+
+LegacyDevice = dataclasses.make_dataclass(
+    "LegacyDevice",
+    [
+        (field.name, field.type, dataclasses.field(default=field.default))
+        for field in dataclasses.fields(Device)
+    ],
+)
+
+
+def legacy_parse(content: bytes) -> dict[str, str]:
+    """Parse a reply the way EcoforestApi did before the single pass parser."""
+    reply = {}
+    for e in content.decode().split("\n")[:-1]:
+        pair = e.split("=")
+        if len(pair) == 2:
+            reply[pair[0]] = pair[1]
+    return {x.translate({32: None}): y for x, y in reply.items()}
+
+
+def legacy_state_build(state: str) -> State:
+    """Build a State scanning the lists of codes."""
+    states = {
+        "OFF": [0],
+        "STARTING": [1, 2, 3, 4, 10],
+        "PRE_HEATING": [5, 6],
+        "ON": [7],
+        "SHUTTING_DOWN": [8, 11, -3],
+        "STAND_BY": [-20],
+        "ALARM": [-4],
+    }
+    for k, v in states.items():
+        if int(state) in v:
+            return State[k]
+    raise ValueError(state)
+
+
+def legacy_alarm_build(alarm: str) -> Alarm | None:
+    """Build an Alarm rebuilding the table on every call."""
+    alarms = {
+        "A001": Alarm.AIR_DEPRESSION,
+        "A002": Alarm.AIR_DEPRESSION,
+        "A012": Alarm.CPU_OVERHEATING,
+        "A099": Alarm.PELLETS,
+        "N": None,
+    }
+    return alarms[alarm] if alarm in alarms else Alarm.UNKNOWN
+
+
+def legacy_operation_mode_build(mode: str) -> OperationMode:
+    """Build an OperationMode rebuilding the table on every call."""
+    modes = {
+        "0": OperationMode.POWER,
+        "1": OperationMode.TEMPERATURE,
+        "2": OperationMode.EMERGENCY,
+    }
+    return modes[mode]
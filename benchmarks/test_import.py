@@ -0,0 +1,28 @@
+"""
+Benchmarks of the cold start, importing the package in a fresh interpreter.
+
+The interpreter start up is included, compare the modules between them.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).parent.parent / "src"
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["pyecoforest.models.device", "pyecoforest.exceptions", "pyecoforest.api"],
+)
+def test_import(benchmark, module):
+    command = [sys.executable, "-c", f"import {module}"]
+    benchmark.pedantic(
+        subprocess.run,
+        args=(command,),
+        kwargs={"check": True, "env": {**os.environ, "PYTHONPATH": str(SRC)}},
+        rounds=10,
+        warmup_rounds=1,
+    )
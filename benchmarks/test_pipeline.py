@@ -0,0 +1,220 @@
+"""
+Benchmarks of the poll, parse and build pipeline.
+
+Run with ``pytest benchmarks --no-cov``; see CONTRIBUTING.md for saving
+and comparing against the baselines stored in benchmarks/baselines.
+"""
+import asyncio
+import dataclasses
+import tracemalloc
+
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi, Refresh
+from pyecoforest.fleet import EcoforestFleet, FleetResult
+from pyecoforest.models.device import (
+    FIELD_SOURCES,
+    Alarm,
+    Device,
+    LazyDevice,
+    OperationMode,
+    State,
+)
+from pyecoforest.openmetrics import MetricsExporter
+from pyecoforest.parser import parse
+from pyecoforest.scheduler import PollScheduler
+from pyecoforest.simulator import (
+    SimulatedStove,
+    SimulatorConfig,
+    SimulatorTransport,
+    start_fleet,
+)
+
+from .conftest import REPLIES
+from .legacy import (
+    LegacyDevice,
+    legacy_alarm_build,
+    legacy_operation_mode_build,
+    legacy_parse,
+    legacy_state_build,
+)
+
+# Keys read by Device.build from the status, stats and alarms replies.
+DEVICE_KEYS = frozenset(key for _, key in FIELD_SOURCES.values())
+
+
+@pytest.mark.parametrize("operation", sorted(REPLIES))
+def test_parse(benchmark, operation):
+    content = REPLIES[operation]
+    api = EcoforestApi("http://127.0.0.1")
+    assert benchmark(api._parse, content) == parse(content)
+
+
+@pytest.mark.parametrize("operation", sorted(REPLIES))
+def test_legacy_parse(benchmark, operation):
+    content = REPLIES[operation]
+    assert benchmark(legacy_parse, content) == parse(content)
+
+
+@pytest.mark.parametrize("operation", sorted(REPLIES))
+def test_parse_device_keys(benchmark, operation):
+    benchmark(parse, REPLIES[operation], keys=DEVICE_KEYS)
+
+
+def test_device_build(benchmark, data):
+    assert benchmark(Device.build, data).serial_number == "000025568680000"
+
+
+def test_lazy_device_build(benchmark, data):
+    # the fields most consumers read
+    def build():
+        device = LazyDevice.build(data)
+        return device.state, device.on, device.alarm
+
+    assert benchmark(build) == (State.OFF, False, None)
+
+
+@pytest.mark.parametrize(
+    ("build", "code"),
+    [
+        (State.build, "-20"),
+        (OperationMode.build, "2"),
+        (Alarm.build, "A099"),
+        (Alarm.build, "N"),
+    ],
+    ids=["state", "operation_mode", "alarm", "no_alarm"],
+)
+def test_enum_build(benchmark, build, code):
+    benchmark(build, code)
+
+
+@pytest.mark.parametrize(
+    ("build", "code"),
+    [
+        (legacy_state_build, "-20"),
+        (legacy_operation_mode_build, "2"),
+        (legacy_alarm_build, "A099"),
+        (legacy_alarm_build, "N"),
+    ],
+    ids=["state", "operation_mode", "alarm", "no_alarm"],
+)
+def test_legacy_enum_build(benchmark, build, code):
+    benchmark(build, code)
+
+
+@pytest.mark.parametrize("model", [LegacyDevice, Device], ids=["legacy", "slotted"])
+def test_device_memory(benchmark, data, model):
+    values = dataclasses.asdict(Device.build(data))
+    tracemalloc.start()
+    instances = [model(**values) for _ in range(10000)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del instances
+    benchmark.extra_info["bytes_per_instance"] = size / 10000
+    benchmark(model, **values)
+
+
+def test_get(benchmark, loop, transport):
+    api = EcoforestApi(
+        "http://127.0.0.1", client=httpx.AsyncClient(transport=transport)
+    )
+    device = benchmark(lambda: loop.run_until_complete(api.get()))
+    assert device.serial_number == "000025568680000"
+
+
+@pytest.mark.parametrize(
+    ("strategy", "max_concurrency"),
+    [("sequential", None), ("concurrent", None), ("concurrent", 1)],
+    ids=["sequential", "concurrent", "concurrent_max_concurrency_1"],
+)
+def test_get_slow_device(benchmark, loop, strategy, max_concurrency):
+    # every operation takes 10ms to answer, like a slow stove
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        operation = request.content.decode().split("&")[0].split("=")[1]
+        return httpx.Response(200, content=REPLIES[operation])
+
+    api = EcoforestApi(
+        "http://127.0.0.1",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        max_concurrency=max_concurrency,
+    )
+
+    async def sequential() -> None:
+        # the three operations one after another, the old behaviour
+        await api.status()
+        await api.stats()
+        await api.alarms()
+
+    poll = sequential if strategy == "sequential" else api.get
+    benchmark.pedantic(lambda: loop.run_until_complete(poll()), rounds=10)
+
+
+@pytest.mark.parametrize("refresh", list(Refresh), ids=lambda r: r.name.lower())
+def test_set_power(benchmark, loop, transport, refresh):
+    api = EcoforestApi(
+        "http://127.0.0.1", client=httpx.AsyncClient(transport=transport)
+    )
+    loop.run_until_complete(api.get())
+    device = benchmark(
+        lambda: loop.run_until_complete(api.set_power(5, refresh=refresh))
+    )
+    assert device.serial_number == "000025568680000"
+
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+def test_fleet_poll(benchmark, loop, size):
+    transport = SimulatorTransport(
+        {f"stove-{i}": SimulatedStove(f"{i:015d}") for i in range(size)}
+    )
+    client = httpx.AsyncClient(transport=transport)
+
+    async def poll() -> int:
+        async with EcoforestFleet(
+            dict.fromkeys(f"http://{host}" for host in transport.stoves),
+            client=client,
+        ) as fleet:
+            results = await fleet.poll_all()
+        return sum(result.device is not None for result in results.values())
+
+    polled = benchmark.pedantic(
+        lambda: loop.run_until_complete(poll()), rounds=5, warmup_rounds=1
+    )
+    assert polled == size
+    loop.run_until_complete(client.aclose())
+
+
+def test_fleet_poll_sockets(benchmark, loop):
+    # 100 devices served over local sockets, each one answering after 50ms
+    config = SimulatorConfig(min_latency=0.05, max_latency=0.05)
+    servers = loop.run_until_complete(start_fleet(100, config))
+
+    async def poll() -> int:
+        async with EcoforestFleet(
+            dict.fromkeys(server.url for server in servers), max_concurrency=100
+        ) as fleet:
+            results = await fleet.poll_all()
+        return sum(result.device is not None for result in results.values())
+
+    polled = benchmark.pedantic(
+        lambda: loop.run_until_complete(poll()), rounds=5, warmup_rounds=1
+    )
+    assert polled == 100
+    for server in servers:
+        loop.run_until_complete(server.stop())
+
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+def test_metrics_render(benchmark, data, size):
+    exporter = MetricsExporter(PollScheduler({}))
+    device = Device.build(data)
+    for i in range(size):
+        exporter.update(FleetResult(f"stove-{i}", device))
+
+    # a scrape after a device got a new reading
+    def render() -> bytes:
+        exporter.update(FleetResult("stove-0", device))
+        return exporter.render()
+
+    assert benchmark(render).endswith(b"# EOF\n")
@@ -0,0 +1,132 @@
+"""Fleet wide watcher of the ecoforest device alarms."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import random
+import time
+from collections.abc import AsyncIterator, Callable, Mapping
+from dataclasses import dataclass
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.models.device import Alarm, State
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class AlarmEvent:
+    """Model for an alarm starting or clearing on a device."""
+
+    host: str
+    alarm: Alarm
+    code: str
+    started_at: float
+    # None while the alarm is still active
+    cleared_at: float | None = None
+    # state of the device when the alarm started or cleared
+    state: State | None = None
+
+    @property
+    def active(self) -> bool:
+        """Return if the alarm is still active."""
+        return self.cleared_at is None
+
+
+class AlarmWatcher:
+    """Class for watching the alarms of many devices at a fast cadence."""
+
+    def __init__(
+        self,
+        apis: Mapping[str, EcoforestApi],
+        interval: float = 5.0,
+        error_interval: float = 30.0,
+        jitter: float = 0.1,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._apis = dict(apis)
+        self._interval = interval
+        self._error_interval = error_interval
+        self._jitter = jitter
+        self._clock = clock
+        self._active: dict[str, AlarmEvent] = {}
+        self._subscribers: set[asyncio.Queue[AlarmEvent]] = set()
+
+    @property
+    def active(self) -> dict[str, AlarmEvent]:
+        """Return the active alarms keyed by host."""
+        return dict(self._active)
+
+    async def subscribe(self) -> AsyncIterator[AlarmEvent]:
+        """Yield the alarm events of every device as they happen."""
+        queue: asyncio.Queue[AlarmEvent] = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+
+    async def run(self) -> None:
+        """Watch every device forever."""
+        tasks = [asyncio.create_task(self._watch(host)) for host in self._apis]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def poll(self, host: str) -> list[AlarmEvent]:
+        """Check the alarms of a device and publish the events."""
+        # Only the alarms are read on every poll, a third of a full get, the
+        # status is read to tell the device state only when an alarm changes.
+        api = self._apis[host]
+        code = (await api.alarms())["get_alarmas"]
+        current = self._active.get(host)
+        if current is not None and current.code == code:
+            return []
+        alarm = Alarm.build(code)
+        if current is None and alarm is None:
+            return []
+
+        now = self._clock()
+        state = State.build((await api.status())["estado"])
+        events = []
+        if current is not None:
+            del self._active[host]
+            events.append(dataclasses.replace(current, cleared_at=now, state=state))
+        if alarm is not None:
+            self._active[host] = AlarmEvent(host, alarm, code, now, state=state)
+            events.append(self._active[host])
+
+        for event in events:
+            for queue in self._subscribers:
+                queue.put_nowait(event)
+        return events
+
+    async def _watch(self, host: str) -> None:
+        """Poll the alarms of a single device forever."""
+        # Spread the first polls so a fleet doesn't poll in sync.
+        await asyncio.sleep(random.uniform(0, self._interval))  # noqa: S311
+        # Only the first failure of a run is a warning, an unreachable device
+        # would otherwise log on every retry.
+        failing = False
+        while True:
+            try:
+                await self.poll(host)
+            except Exception as error:
+                log = _LOGGER.debug if failing else _LOGGER.warning
+                log("Failed to poll the alarms of %s: %s", host, error)
+                failing = True
+                await asyncio.sleep(self._jittered(self._error_interval))
+                continue
+            if failing:
+                _LOGGER.info("Polling the alarms of %s again", host)
+                failing = False
+            await asyncio.sleep(self._jittered(self._interval))
+
+    def _jittered(self, interval: float) -> float:
+        """Spread the interval randomly by the jitter ratio."""
+        spread = random.uniform(1 - self._jitter, 1 + self._jitter)  # noqa: S311
+        return interval * spread
@@ -1,11 +1,21 @@
+from __future__ import annotations
+
+import asyncio
 import logging
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from enum import IntEnum
 from http import HTTPStatus
+from types import TracebackType
 from typing import Any
 
 import httpx
 
-from pyecoforest.models.device import Device
+from pyecoforest.models.device import Device, LazyDevice
 
+from . import ssl
+from .cache import CacheInfo, ResponseCache
 from .const import (
     API_ALARMS_OP,
     API_SET_POWER_OP,
@@ -13,14 +23,49 @@ from .const import (
     API_SET_TEMP_OP,
     API_STATS_OP,
     API_STATUS_OP,
+    LOCAL_LIMITS,
     LOCAL_TIMEOUT,
     URL_CGI,
 )
 from .exceptions import EcoforestAuthenticationRequired, EcoforestConnectionError
-from .ssl import NO_VERIFY_SSL_CONTEXT
+from .metrics import MetricsRecorder, RequestTimer
+from .parser import parse
+from .retry import CircuitBreaker, RetryPolicy
 
 _LOGGER = logging.getLogger(__name__)
 
+# Status fields updated by each write operation.
+_SETPOINTS = {
+    API_SET_STATE_OP: "on_off",
+    API_SET_TEMP_OP: "consigna_temperatura",
+    API_SET_POWER_OP: "consigna_potencia",
+}
+
+
+class Refresh(IntEnum):
+    """Strategies to refresh the device after a write."""
+
+    # Apply the written setpoints to the last known state, no extra request.
+    NONE = 0
+    # Re-fetch only the status, stats and alarms come from the last state.
+    STATUS = 1
+    # Re-fetch status, stats and alarms.
+    FULL = 2
+
+
+@dataclass
+class ConnectionStats:
+    """Model for the connection reuse statistics."""
+
+    requests: int = 0
+    connections: int = 0
+    tls_handshakes: int = 0
+
+    @property
+    def reused(self) -> int:
+        """Return the number of requests sent over an already open connection."""
+        return max(self.requests - self.connections, 0)
+
 
 class EcoforestApi:
     """Class for communicating with an ecoforest device."""
@@ -31,63 +76,226 @@ class EcoforestApi:
         auth: httpx.BasicAuth | None = None,
         client: httpx.AsyncClient | None = None,
         timeout: float | httpx.Timeout | None = None,
+        max_concurrency: int | None = None,
+        cache_ttl: Mapping[int, float] | None = None,
+        limits: httpx.Limits | None = None,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        budget: float | None = None,
+        metrics: MetricsRecorder | None = None,
+        lazy: bool = False,
     ) -> None:
         self._host = host
         self._auth = auth
+        # Use an absolute url so a client can be shared between devices.
+        self._url = f"{host.rstrip('/')}{URL_CGI}"
         # We use our own httpx client session so we can disable SSL verification,
         # the device use self-signed SSL certs.
         self._timeout = timeout or LOCAL_TIMEOUT
+        self._owns_client = client is None
         self._client = client or httpx.AsyncClient(
-            base_url=self._host, verify=NO_VERIFY_SSL_CONTEXT
+            base_url=self._host,
+            verify=ssl.NO_VERIFY_SSL_CONTEXT,
+            limits=limits or LOCAL_LIMITS,
         )  # nosec
+        self._connection_stats = ConnectionStats()
+        self._metrics = metrics
+        # Some firmwares can't cope with parallel requests, allow callers to
+        # bound how many requests are in flight against the device at once.
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        )
+        # Flaky devices are retried with backoff, dead ones fail fast and a
+        # poll never takes longer than the budget.
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._budget = budget
+        # Replies of slow changing operations, e.g. stats, can be cached.
+        self._cache = ResponseCache(cache_ttl)
+        # Concurrent identical reads share the same in flight request, writes
+        # bump the generation so later reads never join a stale request.
+        self._in_flight: dict[int, asyncio.Task[dict[str, str]]] = {}
+        self._generation = 0
+        # Lazy devices only parse the fields their consumers read.
+        self._device_class = LazyDevice if lazy else Device
+        # Last raw data read from the device, used to refresh after writes.
+        self._last: dict[str, dict[str, str]] | None = None
+
+    @property
+    def cache_info(self) -> CacheInfo:
+        """Return the response cache statistics."""
+        return self._cache.info
+
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """Return the connection reuse statistics."""
+        return self._connection_stats
+
+    async def aclose(self) -> None:
+        """Close the client if it was created by the api."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> EcoforestApi:
+        """Enter the api context."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the api context closing the client."""
+        await self.aclose()
 
     async def get(self) -> Device:
         """Retrieve ecoforest information from api."""
-        return Device.build(
-            {
-                "status": await self._status(),
-                "stats": await self._stats(),
-                "alarms": await self._alarms(),
-            }
+        if self._budget is None:
+            return self._build(await self.read_raw())
+
+        try:
+            data = await asyncio.wait_for(self.read_raw(), self._budget)
+        except asyncio.TimeoutError as error:
+            raise EcoforestConnectionError(
+                "Time budget exceeded while polling the device."
+            ) from error
+        return self._build(data)
+
+    async def read_raw(self) -> dict[str, dict[str, str]]:
+        """Retrieve the raw status, stats and alarms replies."""
+        status, stats, alarms = await asyncio.gather(
+            self.status(), self.stats(), self.alarms()
         )
+        return {"status": status, "stats": stats, "alarms": alarms}
+
+    async def status(self) -> dict[str, str]:
+        """Retrieve the raw ecoforest status reply."""
+        return await self._read(API_STATUS_OP)
+
+    async def stats(self) -> dict[str, str]:
+        """Retrieve the raw ecoforest stats reply."""
+        return await self._read(API_STATS_OP)
+
+    async def alarms(self) -> dict[str, str]:
+        """Retrieve the raw ecoforest alarms reply."""
+        return await self._read(API_ALARMS_OP)
 
-    async def turn(self, on: bool | None = False) -> Device:
+    async def turn(
+        self, on: bool | None = False, refresh: Refresh = Refresh.FULL
+    ) -> Device:
         """Turn device on and off."""
-        await self._request(
-            data={"idOperacion": API_SET_STATE_OP, "on_off": 1 if on else 0}
-        )
-        return await self.get()
+        return await self.apply(on=bool(on), refresh=refresh)
 
-    async def set_temperature(self, target: float) -> Device:
+    async def set_temperature(
+        self, target: float, refresh: Refresh = Refresh.FULL
+    ) -> Device:
         """Set device target temperature."""
-        await self._request(
-            data={"idOperacion": API_SET_TEMP_OP, "temperatura": target}
-        )
-        return await self.get()
+        return await self.apply(temperature=target, refresh=refresh)
 
-    async def set_power(self, target: int) -> Device:
+    async def set_power(self, target: int, refresh: Refresh = Refresh.FULL) -> Device:
         """Set device target power."""
-        await self._request(data={"idOperacion": API_SET_POWER_OP, "potencia": target})
-        return await self.get()
+        return await self.apply(power=target, refresh=refresh)
+
+    async def apply(
+        self,
+        on: bool | None = None,
+        temperature: float | None = None,
+        power: int | None = None,
+        refresh: Refresh = Refresh.FULL,
+    ) -> Device:
+        """Send several setpoint changes and refresh the device once."""
+        writes: list[tuple[int, str, Any]] = []
+        if power is not None:
+            writes.append((API_SET_POWER_OP, "potencia", power))
+        if temperature is not None:
+            writes.append((API_SET_TEMP_OP, "temperatura", temperature))
+        if on is not None:
+            writes.append((API_SET_STATE_OP, "on_off", 1 if on else 0))
+
+        confirmed = {}
+        for operation, field, value in writes:
+            reply = await self._write(operation, field, value)
+            # The device reports failed writes through error_* flags.
+            if any(v != "0" for k, v in reply.items() if k.startswith("error_")):
+                refresh = max(refresh, Refresh.STATUS)
+            confirmed[_SETPOINTS[operation]] = str(value)
+
+        if self._last is None or refresh is Refresh.FULL:
+            return await self.get()
+
+        status = confirmed
+        if refresh is Refresh.STATUS:
+            status = await self.status()
+        return self._build({**self._last, "status": {**self._last["status"], **status}})
 
-    async def _request(self, data: dict[str, Any] | None = None) -> httpx.Response:
-        """Make a request to the device."""
+    async def _request(self, data: dict[str, Any] | None = None) -> dict[str, str]:
+        """Make a request to the device, retrying on connection errors."""
+        attempt = 1
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.check()
+            try:
+                reply = await self._acquire_and_send(data)
+            except EcoforestConnectionError:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.record_failure()
+                if self._retry is None or attempt >= self._retry.attempts:
+                    raise
+                await asyncio.sleep(self._retry.delay(attempt))
+                attempt += 1
+            else:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.record_success()
+                return reply
+
+    async def _acquire_and_send(
+        self, data: dict[str, Any] | None = None
+    ) -> dict[str, str]:
+        """Send a request within the per device concurrency bound."""
+        if self._semaphore is None:
+            return await self._send(data)
+
+        async with self._semaphore:
+            return await self._send(data)
+
+    async def _send(self, data: dict[str, Any] | None = None) -> dict[str, str]:
+        """Send a request to the device, recording its metrics."""
+        timer = RequestTimer()
+        error = None
+        try:
+            return await self._post(data, timer)
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            self._connection_stats.connections += timer.connections
+            self._connection_stats.tls_handshakes += timer.tls_handshakes
+            if self._metrics is not None:
+                operation = data.get("idOperacion") if data else None
+                self._metrics.record(timer.metrics(self._host, operation, error))
+
+    async def _post(
+        self, data: dict[str, Any] | None, timer: RequestTimer
+    ) -> dict[str, str]:
+        """Post a request to the device and parse the reply."""
         if _LOGGER.isEnabledFor(logging.DEBUG):
-            _LOGGER.debug("Sending POST to %s with data %s", URL_CGI, data)
+            _LOGGER.debug("Sending POST to %s with data %s", self._url, data)
 
         try:
             response = await self._client.post(
-                URL_CGI,
+                self._url,
                 auth=self._auth,
                 timeout=self._timeout,
                 data=data,
+                extensions={"trace": timer.trace},
             )
             response.raise_for_status()
         except httpx.TimeoutException as error:
             raise EcoforestConnectionError(
                 "Timeout occurred while connecting to the device."
             ) from error
-        except httpx.HTTPError as error:
+        except httpx.HTTPStatusError as error:
             if error.response.status_code in (
                 HTTPStatus.UNAUTHORIZED,
                 HTTPStatus.FORBIDDEN,
@@ -98,39 +306,72 @@ class EcoforestApi:
             raise EcoforestConnectionError(
                 "Error occurred while communicating with device."
             ) from error
+        except httpx.HTTPError as error:
+            raise EcoforestConnectionError(
+                "Error occurred while communicating with device."
+            ) from error
 
-        parsed = self._parse(response.text)
+        self._connection_stats.requests += 1
+        timer.payload_size = len(response.content)
+        started = time.perf_counter()
+        parsed = self._parse(response.content, response.encoding or "utf-8")
+        timer.parse = time.perf_counter() - started
 
         if _LOGGER.isEnabledFor(logging.DEBUG):
             _LOGGER.debug("Received from POST with data %s", parsed)
 
         return parsed
 
-    async def _status(self) -> dict[str, str]:
-        """Retrieve ecoforest status."""
-        return await self._request(data={"idOperacion": API_STATUS_OP})
+    async def _read(self, operation: int) -> dict[str, str]:
+        """Read an operation from the device, using the cache when fresh."""
+        reply = self._cache.get(operation)
+        if reply is not None:
+            return reply
 
-    async def _stats(self) -> dict[str, str]:
-        """Retrieve ecoforest stats."""
-        return await self._request(data={"idOperacion": API_STATS_OP})
+        task = self._in_flight.get(operation)
+        if task is None:
+            task = asyncio.create_task(self._fetch(operation, self._generation))
+            self._in_flight[operation] = task
+            task.add_done_callback(self._forget)
+        # Shield the shared request so a cancelled caller doesn't cancel it
+        # for every other caller waiting on it.
+        return await asyncio.shield(task)
 
-    async def _alarms(self) -> dict[str, str]:
-        """Retrieve ecoforest information from api."""
-        return await self._request(
-            data={
-                "idOperacion": API_ALARMS_OP,
-            }
-        )
+    async def _fetch(self, operation: int, generation: int) -> dict[str, str]:
+        """Request an operation and cache the reply unless a write happened."""
+        reply = await self._request(data={"idOperacion": operation})
+        if generation == self._generation:
+            self._cache.set(operation, reply)
+        return reply
+
+    def _forget(self, task: asyncio.Task[dict[str, str]]) -> None:
+        """Drop a completed read from the in flight requests."""
+        for operation, in_flight in list(self._in_flight.items()):
+            if in_flight is task:
+                del self._in_flight[operation]
+        # Mark the error as retrieved, every caller may have been cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    async def _write(self, operation: int, field: str, value: Any) -> dict[str, str]:
+        """Write an operation to the device, invalidating the cache."""
+        self._generation += 1
+        self._in_flight.clear()
+        try:
+            return await self._request(data={"idOperacion": operation, field: value})
+        finally:
+            # Even a failed write may have reached the device, and reads
+            # started while it was sent may have been answered before it.
+            self._generation += 1
+            self._in_flight.clear()
+            self._cache.invalidate()
+
+    def _build(self, data: dict[str, dict[str, str]]) -> Device:
+        """Build the device and keep the raw data as the last known state."""
+        device = self._device_class.build(data)
+        self._last = data
+        return device
 
-    def _parse(self, response: str) -> dict[str, str]:
+    def _parse(self, content: bytes, encoding: str = "utf-8") -> dict[str, str]:
         """Parse request data and return as dictionary."""
-        # discard last line ?
-        reply = {}
-        for e in response.split("\n")[:-1]:
-            pair = e.split("=")
-            # discard lines without pairs
-            if len(pair) == 2:
-                reply[pair[0]] = pair[1]
-        # Remove all white spaces from bad response from ecoforest ...
-        reply = {x.translate({32: None}): y for x, y in reply.items()}
-        return reply
+        return parse(content, encoding)
@@ -0,0 +1,60 @@
+"""Cache for the ecoforest device replies."""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheInfo:
+    """Model for the cache statistics."""
+
+    hits: int
+    misses: int
+    size: int
+
+
+class ResponseCache:
+    """Class for caching device replies with a TTL per operation code."""
+
+    def __init__(
+        self,
+        ttls: Mapping[int, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttls = dict(ttls or {})
+        self._clock = clock
+        self._entries: dict[int, tuple[float, dict[str, str]]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def info(self) -> CacheInfo:
+        """Return the cache statistics."""
+        return CacheInfo(self._hits, self._misses, len(self._entries))
+
+    def get(self, operation: int) -> dict[str, str] | None:
+        """Return the cached reply for the operation if it did not expire."""
+        if operation not in self._ttls:
+            return None
+
+        entry = self._entries.get(operation)
+        if entry is not None and entry[0] > self._clock():
+            self._hits += 1
+            return entry[1]
+
+        self._misses += 1
+        return None
+
+    def set(self, operation: int, reply: dict[str, str]) -> None:
+        """Cache the reply for the operation if it has a TTL."""
+        if operation in self._ttls:
+            self._entries[operation] = (self._clock() + self._ttls[operation], reply)
+
+    def invalidate(self, operation: int | None = None) -> None:
+        """Drop the cached reply for the operation or every cached reply."""
+        if operation is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(operation, None)
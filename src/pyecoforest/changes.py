@@ -0,0 +1,112 @@
+"""Change detection between successive ecoforest device readings."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.models.device import (
+    FIELD_SOURCES,
+    Device,
+    LazyDevice,
+    source_fields,
+)
+
+# Minimum change of the noisy sensors to be reported.
+DEFAULT_DEADBANDS = {
+    "live_pulse": 0.5,
+    "ntc_temperature": 0.5,
+}
+
+
+@dataclass
+class FieldChange:
+    """Model for the change of a single device field."""
+
+    previous: Any
+    current: Any
+
+
+@dataclass
+class DeviceChanges:
+    """Model for the fields that changed between two readings."""
+
+    device: Device
+    changes: dict[str, FieldChange]
+
+
+class ChangeDetector:
+    """Class for detecting the fields that changed between device readings."""
+
+    def __init__(self, deadbands: Mapping[str, float] | None = None) -> None:
+        self._deadbands = DEFAULT_DEADBANDS if deadbands is None else deadbands
+        self._raw: dict[str, dict[str, str]] | None = None
+        # Values last reported, the deadbands are applied against them so
+        # slow drifts are eventually reported.
+        self._reported: dict[str, Any] = {}
+
+    def update(self, data: dict[str, dict[str, str]]) -> DeviceChanges | None:
+        """Return the changes of a raw reading or None if nothing changed."""
+        previous, self._raw = self._raw, data
+        model = data["stats"]["Me"]
+        if previous is None or previous["stats"].get("Me") != model:
+            candidates = list(FIELD_SOURCES)
+        elif previous == data:
+            return None
+        else:
+            candidates = self._changed_fields(previous, data, model)
+            if not candidates:
+                return None
+
+        # Only build the model once the raw replies show a relevant change,
+        # and only parse the fields that changed.
+        device = LazyDevice.build(data)
+        changes = {}
+        for name in candidates:
+            current = getattr(device, name)
+            before = self._reported.get(name)
+            if name in self._reported and not self._changed(name, before, current):
+                continue
+            changes[name] = FieldChange(before, current)
+            self._reported[name] = current
+
+        if not changes:
+            return None
+        return DeviceChanges(device, changes)
+
+    def _changed_fields(
+        self,
+        previous: dict[str, dict[str, str]],
+        current: dict[str, dict[str, str]],
+        model: str,
+    ) -> list[str]:
+        """Return the device fields whose raw value changed."""
+        # Registered models may read a field from another key.
+        changed = []
+        for (section, key), names in source_fields(model).items():
+            if previous[section].get(key) != current[section].get(key):
+                changed.extend(names)
+        return changed
+
+    def _changed(self, name: str, previous: Any, current: Any) -> bool:
+        """Return if the field changed more than its deadband."""
+        if previous == current:
+            return False
+        deadband = self._deadbands.get(name)
+        if deadband is None or previous is None or current is None:
+            return True
+        return bool(abs(current - previous) >= deadband)
+
+
+async def watch(
+    api: EcoforestApi, interval: float, detector: ChangeDetector | None = None
+) -> AsyncIterator[DeviceChanges]:
+    """Poll the device forever and yield only the readings that changed."""
+    detector = detector or ChangeDetector()
+    while True:
+        changes = detector.update(await api.read_raw())
+        if changes is not None:
+            yield changes
+        await asyncio.sleep(interval)
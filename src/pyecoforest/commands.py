@@ -0,0 +1,133 @@
+"""Queue coalescing the setpoint writes sent to an ecoforest device."""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from pyecoforest.api import EcoforestApi, Refresh
+from pyecoforest.exceptions import EcoforestCommandExpiredError
+from pyecoforest.models.device import Device
+
+
+@dataclass
+class _Setpoint:
+    """Model for the latest pending value of a setpoint."""
+
+    value: Any
+    expires_at: float
+    # callers waiting for this setpoint, including the overwritten values
+    waiters: list[asyncio.Future[Device]] = field(default_factory=list)
+
+
+# Setpoints sent while a batch is pending overwrite each other, only the
+# latest value of each is written and the device is refreshed once for the
+# whole batch. Every caller gets the device refreshed after its batch.
+class CommandQueue:
+    """Class for sending the setpoint writes of a device in merged batches."""
+
+    def __init__(
+        self,
+        api: EcoforestApi,
+        delay: float = 0.05,
+        timeout: float | None = 30.0,
+        refresh: Refresh = Refresh.FULL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._api = api
+        self._delay = delay
+        self._timeout = timeout
+        self._refresh = refresh
+        self._clock = clock
+        # pending setpoints keyed by the EcoforestApi.apply argument
+        self._pending: dict[str, _Setpoint] = {}
+        self._worker: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> dict[str, Any]:
+        """Return the values waiting to be written."""
+        return {name: setpoint.value for name, setpoint in self._pending.items()}
+
+    async def turn(self, on: bool) -> Device:
+        """Turn device on and off."""
+        return await self.submit(on=on)
+
+    async def set_temperature(self, target: float) -> Device:
+        """Set device target temperature."""
+        return await self.submit(temperature=target)
+
+    async def set_power(self, target: int) -> Device:
+        """Set device target power."""
+        return await self.submit(power=target)
+
+    async def submit(
+        self,
+        on: bool | None = None,
+        temperature: float | None = None,
+        power: int | None = None,
+    ) -> Device:
+        """Queue setpoint changes and wait for the device after they're sent."""
+        setpoints = {"on": on, "temperature": temperature, "power": power}
+        if all(value is None for value in setpoints.values()):
+            raise ValueError("At least one setpoint must be given!")
+
+        future: asyncio.Future[Device] = asyncio.get_running_loop().create_future()
+        expires_at = math.inf
+        if self._timeout is not None:
+            expires_at = self._clock() + self._timeout
+        for name, value in setpoints.items():
+            if value is None:
+                continue
+            previous = self._pending.get(name)
+            waiters = previous.waiters if previous else []
+            waiters.append(future)
+            self._pending[name] = _Setpoint(value, expires_at, waiters)
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        """Send the pending setpoints in batches until none are left."""
+        while self._pending:
+            # Let a burst of commands gather before sending them.
+            await asyncio.sleep(self._delay)
+            batch, self._pending = self._pending, {}
+
+            now = self._clock()
+            for name, setpoint in list(batch.items()):
+                if setpoint.expires_at <= now:
+                    del batch[name]
+                    _resolve(
+                        setpoint.waiters,
+                        EcoforestCommandExpiredError(
+                            f"The {name} command expired before being sent!"
+                        ),
+                    )
+            if not batch:
+                continue
+
+            waiters = [w for setpoint in batch.values() for w in setpoint.waiters]
+            try:
+                device = await self._api.apply(
+                    refresh=self._refresh,
+                    **{name: setpoint.value for name, setpoint in batch.items()},
+                )
+            except Exception as error:
+                _resolve(waiters, error)
+            else:
+                _resolve(waiters, device)
+
+
+def _resolve(waiters: list[asyncio.Future[Device]], result: Device | Exception) -> None:
+    """Resolve the callers still waiting with the device or the error."""
+    for waiter in waiters:
+        if waiter.done():
+            continue
+        if isinstance(result, Exception):
+            waiter.set_exception(result)
+        else:
+            waiter.set_result(result)
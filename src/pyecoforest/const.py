@@ -1,4 +1,4 @@
-import httpx
+from typing import Any
 
 # API CGI base path
 URL_CGI = "/recepcion_datos_4.cgi"
@@ -15,10 +15,33 @@ API_SET_STATE_OP = 1013
 API_SET_TEMP_OP = 1019
 API_SET_POWER_OP = 1004
 
-LOCAL_TIMEOUT = httpx.Timeout(
-    # The device can be slow to respond but fast to connect to we
-    # need to set a long timeout for the read and a short timeout
-    # for the connect
-    timeout=10.0,
-    read=60.0,
-)
+
+def __getattr__(name: str) -> Any:
+    """Create the httpx settings on first access, importing httpx is slow."""
+    if name not in ("LOCAL_TIMEOUT", "LOCAL_LIMITS"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import httpx
+
+    value: httpx.Timeout | httpx.Limits
+    if name == "LOCAL_TIMEOUT":
+        value = httpx.Timeout(
+            # The device can be slow to respond but fast to connect to we
+            # need to set a long timeout for the read and a short timeout
+            # for the connect
+            timeout=10.0,
+            read=60.0,
+        )
+    else:
+        value = httpx.Limits(
+            # A poll sends three requests at once, keep their connections open
+            # between polls so steady state polling doesn't pay the TLS handshake.
+            # The expiry outlasts the longest interval of PollScheduler, 600s
+            # plus jitter, at the cost of idle sockets held open on the device;
+            # a connection the device closed first is replaced on the next poll.
+            max_connections=3,
+            max_keepalive_connections=3,
+            keepalive_expiry=900.0,
+        )
+    globals()[name] = value
+    return value
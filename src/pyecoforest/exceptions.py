@@ -1,8 +1,4 @@
-import json
-
-import httpx
-
-ENDPOINT_PROBE_EXCEPTIONS = (json.JSONDecodeError, httpx.HTTPError)
+from typing import Any
 
 
 class EcoforestError(Exception):
@@ -18,3 +14,22 @@ class EcoforestAuthenticationRequired(EcoforestError):
 
     def __init__(self, status: str) -> None:
         self.status = status
+
+
+class EcoforestCircuitOpenError(EcoforestConnectionError):
+    """Exception raised when the device is known to be down."""
+
+
+class EcoforestCommandExpiredError(EcoforestError):
+    """Exception raised when a queued command expired before being sent."""
+
+
+def __getattr__(name: str) -> Any:
+    """Import httpx only when the probe exceptions are used."""
+    if name == "ENDPOINT_PROBE_EXCEPTIONS":
+        import json
+
+        import httpx
+
+        return (json.JSONDecodeError, httpx.HTTPError)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
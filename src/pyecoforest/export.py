@@ -0,0 +1,216 @@
+"""Columnar export of the ecoforest device readings."""
+from __future__ import annotations
+
+import asyncio
+import csv
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterable, Callable
+from dataclasses import fields
+from enum import Enum
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from pyecoforest.exceptions import EcoforestError
+from pyecoforest.fleet import FleetResult
+from pyecoforest.models.device import FIELD_TYPES, Device
+
+# pyarrow is optional, CSV files are exported without it.
+try:
+    import pyarrow as pa  # type: ignore[import-untyped]
+    import pyarrow.parquet as pq  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+
+# Fixed schema of the exported readings, column name to column type.
+SCHEMA = {"host": "str", "timestamp": "float", **FIELD_TYPES}
+
+_DEVICE_COLUMNS = tuple(field.name for field in fields(Device))
+
+
+class ColumnarWriter(ABC):
+    """Base class for the files the readings are exported to."""
+
+    @abstractmethod
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        """Append a batch of readings, given column by column."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close the file."""
+
+
+# Parquet files can't be appended to, so an existing file is never
+# overwritten, the readings go to the next free part file next to it,
+# e.g. readings-0001.parquet.
+class ParquetWriter(ColumnarWriter):
+    """Class for exporting the readings to a Parquet file, a row group a batch."""
+
+    def __init__(self, path: str | Path, compression: str = "zstd") -> None:
+        if pq is None:
+            raise EcoforestError("pyarrow is required to export Parquet files!")
+        types = {
+            "bool": pa.bool_(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "str": pa.string(),
+        }
+        self._schema = pa.schema([(name, types[kind]) for name, kind in SCHEMA.items()])
+        self.path = _free_path(Path(path))
+        self._writer = pq.ParquetWriter(
+            self.path, self._schema, compression=compression
+        )
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        """Append a batch of readings as a row group."""
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+
+    def close(self) -> None:
+        """Write the footer and close the file."""
+        self._writer.close()
+
+
+class CsvWriter(ColumnarWriter):
+    """Class for appending the readings to a compact CSV file."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        header = list(SCHEMA)
+        if path.exists() and path.stat().st_size:
+            with path.open(newline="") as existing:
+                if next(csv.reader(existing), None) != header:
+                    raise EcoforestError(f"The file {path} has a different schema!")
+            header = []
+        self._file = path.open("a", newline="")
+        self._writer = csv.writer(self._file)
+        if header:
+            self._writer.writerow(header)
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        """Append a batch of readings, booleans as 0 or 1 and None as empty."""
+        for name, kind in SCHEMA.items():
+            if kind == "bool":
+                columns[name] = [None if v is None else int(v) for v in columns[name]]
+        self._writer.writerows(zip(*columns.values()))
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+def _free_path(path: Path) -> Path:
+    """Return the path, or the next free part file when it already exists."""
+    part, number = path, 0
+    while part.exists():
+        number += 1
+        part = path.with_name(f"{path.stem}-{number:04d}{path.suffix}")
+    return part
+
+
+def create_writer(path: str | Path) -> ColumnarWriter:
+    """Return the writer for the file extension, .parquet or .csv."""
+    suffix = Path(path).suffix
+    if suffix == ".parquet":
+        return ParquetWriter(path)
+    if suffix == ".csv":
+        return CsvWriter(path)
+    raise EcoforestError(f"The export format {suffix} is not supported!")
+
+
+class DeviceExporter:
+    """Class for exporting device readings to a columnar file in batches."""
+
+    def __init__(
+        self,
+        writer: ColumnarWriter | str | Path,
+        batch_size: int = 1000,
+        flush_interval: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive!")
+        self._writer = (
+            writer if isinstance(writer, ColumnarWriter) else create_writer(writer)
+        )
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._clock = clock
+        # Readings are buffered column by column, at most a batch of them.
+        self._columns: dict[str, list[Any]] = {name: [] for name in SCHEMA}
+        self._size = 0
+        self._flushed_at = clock()
+
+    def __len__(self) -> int:
+        """Return the number of readings waiting to be written."""
+        return self._size
+
+    def add(self, host: str, device: Device, timestamp: float | None = None) -> None:
+        """Buffer a reading, writing the batch when full or due."""
+        # A due batch is only written when a reading is added, export() also
+        # writes it while no reading arrives, other callers should flush().
+        now = self._clock()
+        self._columns["host"].append(host)
+        self._columns["timestamp"].append(now if timestamp is None else timestamp)
+        for name in _DEVICE_COLUMNS:
+            value = getattr(device, name)
+            if isinstance(value, Enum):
+                value = value.value
+            self._columns[name].append(value)
+        self._size += 1
+        if (
+            self._size >= self._batch_size
+            or now - self._flushed_at >= self._flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered readings."""
+        self._flushed_at = self._clock()
+        if not self._size:
+            return
+        columns, self._columns = self._columns, {name: [] for name in SCHEMA}
+        self._size = 0
+        self._writer.write(columns)
+
+    def close(self) -> None:
+        """Write the buffered readings and close the file."""
+        self.flush()
+        self._writer.close()
+
+    async def export(self, results: AsyncIterable[FleetResult]) -> None:
+        """Export the readings of a poll stream, skipping the failed polls."""
+        flusher = None
+        if self._flush_interval > 0:
+            flusher = asyncio.create_task(self._flush_when_due())
+        try:
+            async for result in results:
+                if result.device is not None:
+                    self.add(result.host, result.device)
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+
+    async def _flush_when_due(self) -> None:
+        """Write the buffered readings once due, even if no reading arrives."""
+        while True:
+            due = self._flushed_at + self._flush_interval - self._clock()
+            await asyncio.sleep(max(due, 0))
+            if self._clock() - self._flushed_at >= self._flush_interval:
+                self.flush()
+
+    def __enter__(self) -> DeviceExporter:
+        """Enter the exporter context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the exporter context closing the file."""
+        self.close()
@@ -0,0 +1,138 @@
+"""Poller for a fleet of ecoforest devices."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Mapping
+from dataclasses import dataclass
+from types import TracebackType
+
+import httpx
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.models.device import Device
+
+from . import ssl
+from .const import LOCAL_LIMITS
+from .retry import CircuitBreaker, RetryPolicy
+
+
+@dataclass
+class FleetResult:
+    """Outcome of polling a single device of the fleet."""
+
+    host: str
+    device: Device | None = None
+    error: Exception | None = None
+
+
+class EcoforestFleet:
+    """Class for polling many ecoforest devices through shared clients."""
+
+    def __init__(
+        self,
+        hosts: Mapping[str, httpx.BasicAuth | None],
+        client: httpx.AsyncClient | None = None,
+        timeout: float | httpx.Timeout | None = None,
+        max_concurrency: int = 100,
+        max_concurrency_per_host: int | None = None,
+        limits: httpx.Limits | None = None,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: Callable[[], CircuitBreaker] | None = None,
+        budget: float | None = None,
+        hosts_per_client: int | None = None,
+        lazy: bool = False,
+    ) -> None:
+        # By default every device shares a single client. The httpx connection
+        # pool scans every pooled connection for each queued request, so for
+        # hundreds of devices splitting them in groups of hosts_per_client,
+        # each with its own client, polls faster.
+        hosts_per_client = hosts_per_client or max(len(hosts), 1)
+        self._owned_clients: list[httpx.AsyncClient] = []
+        if client is None:
+            for _ in range(0, len(hosts), hosts_per_client):
+                self._owned_clients.append(
+                    self._create_client(hosts_per_client, max_concurrency, limits)
+                )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._apis = {
+            host: EcoforestApi(
+                host,
+                auth=auth,
+                client=client or self._owned_clients[i // hosts_per_client],
+                timeout=timeout,
+                max_concurrency=max_concurrency_per_host,
+                retry=retry,
+                circuit_breaker=circuit_breaker() if circuit_breaker else None,
+                budget=budget,
+                lazy=lazy,
+            )
+            for i, (host, auth) in enumerate(hosts.items())
+        }
+
+    @property
+    def hosts(self) -> list[str]:
+        """Return the hosts of the fleet."""
+        return list(self._apis)
+
+    def api(self, host: str) -> EcoforestApi:
+        """Return the api used for a single device of the fleet."""
+        return self._apis[host]
+
+    async def poll(self) -> AsyncIterator[FleetResult]:
+        """Poll every device and yield the results as they complete."""
+        tasks = [
+            asyncio.create_task(self._poll(host, api))
+            for host, api in self._apis.items()
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def poll_all(self) -> dict[str, FleetResult]:
+        """Poll every device and return the results keyed by host."""
+        return {result.host: result async for result in self.poll()}
+
+    async def aclose(self) -> None:
+        """Close the shared clients if they were created by the fleet."""
+        for client in self._owned_clients:
+            await client.aclose()
+
+    async def __aenter__(self) -> EcoforestFleet:
+        """Enter the fleet context."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the fleet context closing the shared client."""
+        await self.aclose()
+
+    def _create_client(
+        self, hosts: int, max_concurrency: int, limits: httpx.Limits | None
+    ) -> httpx.AsyncClient:
+        """Create a client shared by a group of hosts."""
+        # Every device is polled with three requests at most, size the pool
+        # so concurrent polls never wait on a free connection.
+        return httpx.AsyncClient(
+            verify=ssl.NO_VERIFY_SSL_CONTEXT,
+            limits=limits
+            or httpx.Limits(
+                max_connections=min(hosts, max_concurrency) * 3,
+                max_keepalive_connections=hosts * 3,
+                keepalive_expiry=LOCAL_LIMITS.keepalive_expiry,
+            ),
+        )  # nosec
+
+    async def _poll(self, host: str, api: EcoforestApi) -> FleetResult:
+        """Poll a single device, one failing device must not stop the others."""
+        async with self._semaphore:
+            try:
+                return FleetResult(host, device=await api.get())
+            except Exception as error:
+                return FleetResult(host, error=error)
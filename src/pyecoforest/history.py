@@ -0,0 +1,119 @@
+"""History of the ecoforest device readings."""
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass, fields
+
+from pyecoforest.models.device import Device
+
+# Numeric fields of the device, one column is kept for each of them.
+NUMERIC_FIELDS = tuple(
+    field.name
+    for field in fields(Device)
+    if field.type in ("int", "float", "int | None", "float | None")
+)
+
+
+@dataclass
+class WindowStats:
+    """Model for the aggregates of a field over a time window."""
+
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+    # change per second between the first and last reading of the window
+    rate: float
+
+
+class DeviceHistory:
+    """Class for recording device readings into fixed size ring buffers."""
+
+    def __init__(
+        self, capacity: int = 1024, columns: Sequence[str] = NUMERIC_FIELDS
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("The history capacity must be positive!")
+        unknown = set(columns) - set(NUMERIC_FIELDS)
+        if unknown:
+            raise ValueError(f"The fields {sorted(unknown)} are not numeric!")
+
+        self._capacity = capacity
+        self._size = 0
+        # position where the next reading is written
+        self._next = 0
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._columns = {name: array("d", bytes(8 * capacity)) for name in columns}
+
+    def __len__(self) -> int:
+        """Return the number of readings recorded."""
+        return self._size
+
+    @property
+    def columns(self) -> list[str]:
+        """Return the fields recorded."""
+        return list(self._columns)
+
+    def append(self, device: Device, timestamp: float | None = None) -> None:
+        """Record a device reading, overwriting the oldest when full."""
+        index = self._next
+        self._timestamps[index] = time.time() if timestamp is None else timestamp
+        for name, column in self._columns.items():
+            value = getattr(device, name)
+            # missing readings are stored as NaN and skipped by aggregates
+            column[index] = math.nan if value is None else value
+        self._next = (index + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def timestamps(self) -> array[float]:
+        """Return the timestamps from the oldest to the newest reading."""
+        return self._ordered(self._timestamps)
+
+    def column(self, name: str) -> array[float]:
+        """Return the values of a field from the oldest to the newest reading."""
+        return self._ordered(self._columns[name])
+
+    def window(
+        self, name: str, seconds: float | None = None, now: float | None = None
+    ) -> tuple[array[float], array[float]]:
+        """Return the timestamps and values of a field in the last seconds."""
+        timestamps = self.timestamps()
+        values = self.column(name)
+        if seconds is None:
+            return timestamps, values
+
+        start = bisect_left(timestamps, (time.time() if now is None else now) - seconds)
+        return timestamps[start:], values[start:]
+
+    def stats(
+        self, name: str, seconds: float | None = None, now: float | None = None
+    ) -> WindowStats | None:
+        """Return the aggregates of a field in the last seconds."""
+        timestamps, values = self.window(name, seconds, now)
+        total = math.fsum(values)
+        if math.isnan(total):
+            keep = [i for i, value in enumerate(values) if not math.isnan(value)]
+            timestamps = array("d", (timestamps[i] for i in keep))
+            values = array("d", (values[i] for i in keep))
+            total = math.fsum(values)
+        if not values:
+            return None
+
+        elapsed = timestamps[-1] - timestamps[0]
+        return WindowStats(
+            count=len(values),
+            minimum=min(values),
+            maximum=max(values),
+            mean=total / len(values),
+            rate=(values[-1] - values[0]) / elapsed if elapsed else 0.0,
+        )
+
+    def _ordered(self, column: array[float]) -> array[float]:
+        """Return the recorded part of a column in insertion order."""
+        if self._size < self._capacity:
+            return column[: self._size]
+        return column[self._next :] + column[: self._next]
@@ -0,0 +1,176 @@
+"""Metrics of the requests sent to the ecoforest devices."""
+from __future__ import annotations
+
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+@dataclass
+class RequestMetrics:
+    """Model for the metrics of a single request."""
+
+    host: str
+    operation: int | None
+    # seconds spent opening the connection, None when it was reused
+    connect: float | None
+    # seconds until the response headers were received
+    first_byte: float | None
+    total: float
+    payload_size: int = 0
+    parse: float = 0.0
+    # class name of the error that failed the request, e.g. ConnectError
+    # rather than the EcoforestConnectionError raised from it, None on success
+    error: str | None = None
+
+
+class MetricsRecorder(ABC):
+    """Base class for the receivers of the request metrics."""
+
+    @abstractmethod
+    def record(self, metrics: RequestMetrics) -> None:
+        """Record the metrics of a request."""
+
+
+class RequestTimer:
+    """Class for timing the phases of a request through the transport trace."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.payload_size = 0
+        self.parse = 0.0
+        self._connect_started: float | None = None
+        self._connected: float | None = None
+        self._first_byte: float | None = None
+
+    async def trace(self, event: str, info: dict[str, Any]) -> None:
+        """Receive the httpcore trace events of the request."""
+        if event == "connection.connect_tcp.started":
+            self._connect_started = time.perf_counter()
+        elif event == "connection.connect_tcp.complete":
+            self.connections += 1
+            self._connected = time.perf_counter()
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+            self._connected = time.perf_counter()
+        elif event.endswith(".receive_response_headers.complete"):
+            self._first_byte = time.perf_counter()
+
+    def metrics(
+        self, host: str, operation: int | None, error: BaseException | None = None
+    ) -> RequestMetrics:
+        """Return the metrics of the timed request."""
+        connect = None
+        if self._connect_started is not None and self._connected is not None:
+            connect = self._connected - self._connect_started
+        return RequestMetrics(
+            host=host,
+            operation=operation,
+            connect=connect,
+            first_byte=(
+                None if self._first_byte is None else self._first_byte - self.started
+            ),
+            total=time.perf_counter() - self.started,
+            payload_size=self.payload_size,
+            parse=self.parse,
+            error=None if error is None else type(error.__cause__ or error).__name__,
+        )
+
+
+class Histogram:
+    """Class for counting observations into fixed buckets."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = (*sorted(buckets), math.inf)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the observations."""
+        return self.sum / self.count if self.count else 0.0
+
+    def observe(self, value: float) -> None:
+        """Count an observation in its bucket."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0.0
+
+
+@dataclass
+class OperationMetrics:
+    """Model for the aggregated metrics of an operation on a device."""
+
+    total: Histogram = field(default_factory=Histogram)
+    connect: Histogram = field(default_factory=Histogram)
+    first_byte: Histogram = field(default_factory=Histogram)
+    parse: Histogram = field(default_factory=Histogram)
+    payload_size: int = 0
+    errors: Counter[str] = field(default_factory=Counter)
+
+
+class InMemoryMetrics(MetricsRecorder):
+    """Class for aggregating the request metrics in memory histograms."""
+
+    def __init__(self) -> None:
+        self._operations: defaultdict[
+            tuple[str, int | None], OperationMetrics
+        ] = defaultdict(OperationMetrics)
+
+    def record(self, metrics: RequestMetrics) -> None:
+        """Aggregate the metrics of a request by host and operation."""
+        aggregated = self._operations[(metrics.host, metrics.operation)]
+        aggregated.total.observe(metrics.total)
+        if metrics.connect is not None:
+            aggregated.connect.observe(metrics.connect)
+        if metrics.first_byte is not None:
+            aggregated.first_byte.observe(metrics.first_byte)
+        if metrics.error is None:
+            aggregated.parse.observe(metrics.parse)
+            aggregated.payload_size += metrics.payload_size
+        else:
+            aggregated.errors[metrics.error] += 1
+
+    def get(self, host: str, operation: int | None) -> OperationMetrics:
+        """Return the aggregated metrics of an operation on a device."""
+        aggregated = self._operations.get((host, operation))
+        return OperationMetrics() if aggregated is None else aggregated
+
+    def items(self) -> list[tuple[tuple[str, int | None], OperationMetrics]]:
+        """Return the aggregated metrics keyed by host and operation."""
+        return list(self._operations.items())
@@ -1,8 +1,10 @@
 """Model for the Ecoforest stove status."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Callable, Mapping
+from dataclasses import MISSING, Field, dataclass, fields
 from enum import Enum
+from typing import Any
 
 from pyecoforest.const import MODEL_NAME, SUPPORTED_MODELS
 from pyecoforest.exceptions import EcoforestError
@@ -18,18 +20,19 @@ class OperationMode(Enum):
     @classmethod
     def build(cls, mode: str) -> OperationMode:
         """Parse the operation mode code to an OperationMode object."""
-        modes = {
-            "0": OperationMode.POWER,
-            "1": OperationMode.TEMPERATURE,
-            "2": OperationMode.EMERGENCY,
-        }
-
-        if mode in modes:
-            return modes[mode]
+        if mode in _OPERATION_MODES:
+            return _OPERATION_MODES[mode]
 
         raise EcoforestError(f"The operation mode {mode} is not a valid operation!")
 
 
+_OPERATION_MODES = {
+    "0": OperationMode.POWER,
+    "1": OperationMode.TEMPERATURE,
+    "2": OperationMode.EMERGENCY,
+}
+
+
 class State(Enum):
     """Model that represents the state of the device."""
 
@@ -44,23 +47,31 @@ class State(Enum):
     @classmethod
     def build(cls, state: str) -> State:
         """Parse the state code to a State object."""
-        states = {
-            "OFF": [0],
-            "STARTING": [1, 2, 3, 4, 10],
-            "PRE_HEATING": [5, 6],
-            "ON": [7],
-            "SHUTTING_DOWN": [8, 11, -3],
-            "STAND_BY": [-20],
-            "ALARM": [-4],
-        }
-
-        for k, v in states.items():
-            if int(state) in v:
-                return State[k]
+        code = int(state)
+        if code in _STATES:
+            return _STATES[code]
 
         raise EcoforestError(f"The state {state} is not a valid state!")
 
 
+_STATES = {
+    0: State.OFF,
+    1: State.STARTING,
+    2: State.STARTING,
+    3: State.STARTING,
+    4: State.STARTING,
+    10: State.STARTING,
+    5: State.PRE_HEATING,
+    6: State.PRE_HEATING,
+    7: State.ON,
+    8: State.SHUTTING_DOWN,
+    11: State.SHUTTING_DOWN,
+    -3: State.SHUTTING_DOWN,
+    -20: State.STAND_BY,
+    -4: State.ALARM,
+}
+
+
 class Alarm(Enum):
     """Model that represents the alarms of the device."""
 
@@ -72,21 +83,23 @@ class Alarm(Enum):
     @classmethod
     def build(cls, alarm: str) -> Alarm | None:
         """Parse the alarm code to an Alarm object."""
-        alarms = {
-            "A001": Alarm.AIR_DEPRESSION,
-            "A002": Alarm.AIR_DEPRESSION,
-            "A012": Alarm.CPU_OVERHEATING,
-            "A099": Alarm.PELLETS,
-            "N": None,
-        }
-
-        if alarm in alarms:
-            return alarms[alarm]
+        if alarm in _ALARMS:
+            return _ALARMS[alarm]
 
         return Alarm.UNKNOWN
 
 
-@dataclass
+_ALARMS = {
+    "A001": Alarm.AIR_DEPRESSION,
+    "A002": Alarm.AIR_DEPRESSION,
+    "A012": Alarm.CPU_OVERHEATING,
+    "A099": Alarm.PELLETS,
+    "N": None,
+}
+
+
+# Slotted so the many snapshots kept in memory don't carry a __dict__ each.
+@dataclass(slots=True)
 class Device:
     """Model for the Ecoforest stove."""
 
@@ -123,37 +136,221 @@ class Device:
     extractor: float | None = None
     convecto_air_flow: float | None = None
 
+    # extra sensors, only parsed for the models whose schema defines them
+    ambient_temperature: float | None = None
+    differential_pressure: float | None = None
+    pressure: float | None = None
+    return_temperature: float | None = None
+
     @classmethod
     def build(cls, data: dict[str, dict[str, str]]) -> Device:
         """Parse request data and return as Device."""
-        status = data["status"]
-        stats = data["stats"]
-        alarms = data["alarms"]
-        model = stats["Me"]
-        return Device(
-            is_supported=model in SUPPORTED_MODELS,
-            model=model,
-            model_name=MODEL_NAME,
-            firmware=stats["Vs"],
-            serial_number=stats["Ns"],
-            operation_mode=OperationMode.build(status["modo_operacion"]),
-            on=status["on_off"] == "1",
-            state=State.build(status["estado"]),
-            power=int(status["consigna_potencia"]),
-            temperature=float(status["consigna_temperatura"]),
-            alarm=Alarm.build(alarms["get_alarmas"]),
-            alarm_code=alarms["get_alarmas"] if alarms["get_alarmas"] != "N" else None,
-            environment_temperature=float(status["temperatura"]),
-            cpu_temperature=float(stats["Tp"]),
-            gas_temperature=float(stats["Th"]),
-            ntc_temperature=float(stats["Tn"]),
-            depression=int(stats["Da"]),
-            working_hours=int(stats["Nh"]),
-            ignitions=int(stats["Ne"]),
-            live_pulse=float(stats["Pn"]),
-            pulse_offset=float(stats["Pf"]),
-            working_state=int(stats["Es"]),
-            extractor=float(stats["Ex"]),
-            working_level=int(stats["Ni"]),
-            convecto_air_flow=float(stats["Co"]),
+        return _decoder(data["stats"]["Me"])(cls, data)
+
+
+# Raw reply section and key each field is read from, and its conversion.
+FieldSpec = tuple[str, str, Callable[[str], Any]]
+
+# Fields reported by every model.
+COMMON_FIELDS: dict[str, FieldSpec] = {
+    "model": ("stats", "Me", str),
+    "firmware": ("stats", "Vs", str),
+    "serial_number": ("stats", "Ns", str),
+    "operation_mode": ("status", "modo_operacion", OperationMode.build),
+    "on": ("status", "on_off", lambda on_off: on_off == "1"),
+    "state": ("status", "estado", State.build),
+    "power": ("status", "consigna_potencia", int),
+    "temperature": ("status", "consigna_temperatura", float),
+    "alarm": ("alarms", "get_alarmas", Alarm.build),
+    "alarm_code": ("alarms", "get_alarmas", lambda code: code if code != "N" else None),
+    "environment_temperature": ("status", "temperatura", float),
+    "cpu_temperature": ("stats", "Tp", float),
+    "gas_temperature": ("stats", "Th", float),
+    "ntc_temperature": ("stats", "Tn", float),
+    "depression": ("stats", "Da", int),
+    "working_hours": ("stats", "Nh", int),
+    "ignitions": ("stats", "Ne", int),
+    "live_pulse": ("stats", "Pn", float),
+    "pulse_offset": ("stats", "Pf", float),
+    "working_state": ("stats", "Es", int),
+    "extractor": ("stats", "Ex", float),
+    "working_level": ("stats", "Ni", int),
+    "convecto_air_flow": ("stats", "Co", float),
+}
+
+# Fields only reported by some models.
+EXTRA_FIELDS: dict[str, FieldSpec] = {
+    "ambient_temperature": ("stats", "Ta", float),
+    "differential_pressure": ("stats", "Dp", float),
+    "pressure": ("stats", "Pa", float),
+    "return_temperature": ("stats", "Rt", float),
+}
+
+
+@dataclass(frozen=True)
+class ModelSchema:
+    """Model for the fields reported by a stove model."""
+
+    model_name: str
+    fields: Mapping[str, FieldSpec]
+    is_supported: bool = True
+
+
+# Schemas keyed by the model reported in the Me stats key.
+MODEL_SCHEMAS = {
+    model: ModelSchema(MODEL_NAME, {**COMMON_FIELDS, **EXTRA_FIELDS})
+    for model in SUPPORTED_MODELS
+}
+
+# Unknown models are parsed with the fields every model reports.
+UNKNOWN_MODEL_SCHEMA = ModelSchema(MODEL_NAME, COMMON_FIELDS, is_supported=False)
+
+# Raw reply section and key each device field is parsed from.
+FIELD_SOURCES = {
+    "is_supported": ("stats", "Me"),
+    **{name: (section, key) for name, (section, key, _) in COMMON_FIELDS.items()},
+    **{name: (section, key) for name, (section, key, _) in EXTRA_FIELDS.items()},
+}
+
+
+def _field_type(field: Field[Any]) -> str:
+    """Return the type of the value of a device field, enums hold strings."""
+    kind = str(field.type).removesuffix(" | None")
+    return kind if kind in ("bool", "int", "float", "str") else "str"
+
+
+# Type of the value of each device field.
+FIELD_TYPES = {field.name: _field_type(field) for field in fields(Device)}
+
+_SECTIONS = ("status", "stats", "alarms")
+_DEFAULTS = {field.name: field.default for field in fields(Device)}
+
+_Decoder = Callable[[type[Device], dict[str, dict[str, str]]], Device]
+
+# Decoders built on first sight of each model, None for unknown models.
+_DECODERS: dict[str | None, _Decoder] = {}
+# Device fields by the raw key they are read from, built like the decoders.
+_SOURCE_FIELDS: dict[str | None, dict[tuple[str, str], list[str]]] = {}
+
+
+def register_model(model: str, schema: ModelSchema) -> None:
+    """Add or replace the schema of a stove model."""
+    MODEL_SCHEMAS[model] = schema
+    _DECODERS.pop(model, None)
+    _SOURCE_FIELDS.pop(model, None)
+
+
+def model_schema(model: str) -> ModelSchema:
+    """Return the schema of a stove model."""
+    return MODEL_SCHEMAS.get(model, UNKNOWN_MODEL_SCHEMA)
+
+
+def _decoder(model: str) -> _Decoder:
+    """Return the decoder of a model, building it on first sight."""
+    key = model if model in MODEL_SCHEMAS else None
+    decoder = _DECODERS.get(key)
+    if decoder is None:
+        decoder = _DECODERS[key] = _build_decoder(model_schema(model))
+    return decoder
+
+
+def source_fields(model: str) -> dict[tuple[str, str], list[str]]:
+    """Return the fields of a model keyed by their raw section and key."""
+    key = model if model in MODEL_SCHEMAS else None
+    sources = _SOURCE_FIELDS.get(key)
+    if sources is None:
+        sources = _SOURCE_FIELDS[key] = {("stats", "Me"): ["is_supported"]}
+        for name, (section, raw_key, _) in model_schema(model).fields.items():
+            sources.setdefault((section, raw_key), []).append(name)
+    return sources
+
+
+def _build_decoder(schema: ModelSchema) -> _Decoder:
+    """Return a function building the devices of a schema."""
+    # The schema is checked and split once, so decoding is a loop over the
+    # required fields and one over the optional ones, with no branch per field.
+    required: list[tuple[str, str, str, Callable[[str], Any]]] = []
+    optional: list[tuple[str, str, str, Callable[[str], Any]]] = []
+    for name, (section, key, convert) in schema.fields.items():
+        if name not in _DEFAULTS or section not in _SECTIONS:
+            raise EcoforestError(f"The field {name} can't be parsed from {section}!")
+        specs = required if _DEFAULTS[name] is MISSING else optional
+        specs.append((name, section, key, convert))
+    constants = {"is_supported": schema.is_supported, "model_name": schema.model_name}
+
+    def decode(cls: type[Device], data: dict[str, dict[str, str]]) -> Device:
+        values: dict[str, Any] = dict(constants)
+        for name, section, key, convert in required:
+            values[name] = convert(data[section][key])
+        # optional fields are None when the reply misses their key
+        for name, section, key, convert in optional:
+            raw = data[section].get(key)
+            values[name] = None if raw is None else convert(raw)
+        return cls(**values)
+
+    return decode
+
+
+# Most consumers only read a few fields, e.g. state, on and alarm, so the
+# conversions are deferred until the fields are read. Invalid values are
+# only reported when the field is read.
+class LazyDevice(Device):
+    """Model for the Ecoforest stove parsing each field on first access."""
+
+    # Only the raw data is kept, the schema is looked up from its model, so
+    # lazy devices can be copied and pickled like any other device.
+    __slots__ = ("_data",)
+
+    def __new__(cls, *args: Any, **changes: Any) -> Any:
+        """Return a parsed device when built from field values."""
+        # dataclasses.replace builds the copy through the class of the device
+        # with every field as a keyword, so replacing fields of a lazy device
+        # gives a plain Device.
+        if changes:
+            return Device(**changes)
+        return super().__new__(cls)
+
+    def __init__(self, data: dict[str, dict[str, str]]) -> None:
+        schema = model_schema(data["stats"]["Me"])
+        self._data = data
+        self.is_supported = schema.is_supported
+        self.model_name = schema.model_name
+
+    @classmethod
+    def build(cls, data: dict[str, dict[str, str]]) -> LazyDevice:
+        """Wrap request data without parsing it."""
+        return cls(data)
+
+    def __getattr__(self, name: str) -> Any:
+        """Parse a field the first time it is read, the slot caches it."""
+        if name.startswith("_"):
+            # private and special names, e.g. _data while being copied, are
+            # never parsed so reading them can't recurse
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        schema_fields = model_schema(self._data["stats"]["Me"]).fields
+        if name in schema_fields:
+            section, key, convert = schema_fields[name]
+            raw = self._data[section].get(key)
+            if raw is None and _DEFAULTS[name] is MISSING:
+                raise KeyError(key)
+            value = None if raw is None else convert(raw)
+        elif name in _DEFAULTS:
+            # fields the model doesn't report
+            value = _DEFAULTS[name]
+        else:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        setattr(self, name, value)
+        return value
+
+    def __eq__(self, other: object) -> bool:
+        """Compare field by field with any device, lazy or not."""
+        if not isinstance(other, Device):
+            return NotImplemented
+        return all(
+            getattr(self, field.name) == getattr(other, field.name)
+            for field in fields(Device)
         )
@@ -0,0 +1,223 @@
+"""OpenMetrics exporter serving the last readings of ecoforest devices."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import time
+from collections.abc import Callable
+from enum import Enum
+from http import HTTPStatus
+from types import TracebackType
+
+import httpx
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.fleet import FleetResult
+from pyecoforest.models.device import (
+    FIELD_TYPES,
+    Alarm,
+    Device,
+    OperationMode,
+    State,
+)
+from pyecoforest.scheduler import PollScheduler
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Numeric and boolean fields exported as a gauge each.
+GAUGE_FIELDS = tuple(
+    name
+    for name, kind in FIELD_TYPES.items()
+    if kind != "str" and name != "is_supported"
+)
+
+# Enum fields exported as a state set each, one sample per possible value.
+STATESET_FIELDS: dict[str, type[Enum]] = {
+    "state": State,
+    "operation_mode": OperationMode,
+    "alarm": Alarm,
+}
+
+# Metric families in exposition order, with their type.
+FAMILIES = (
+    ("ecoforest_up", "gauge"),
+    ("ecoforest_last_poll_timestamp_seconds", "gauge"),
+    ("ecoforest_device", "info"),
+    *((f"ecoforest_{name}", "gauge") for name in GAUGE_FIELDS),
+    *((f"ecoforest_{name}", "stateset") for name in STATESET_FIELDS),
+)
+
+_HEADERS = tuple(f"# TYPE {name} {kind}\n" for name, kind in FAMILIES)
+
+
+# The devices are polled by the scheduler on its own schedule, the scrapes
+# are answered from the last readings and never reach the devices.
+class MetricsExporter:
+    """Class for serving the last reading of each device as OpenMetrics."""
+
+    def __init__(
+        self,
+        scheduler: PollScheduler,
+        host: str = "127.0.0.1",
+        port: int = 9423,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._scheduler = scheduler
+        self._host = host
+        self._port = port
+        self._clock = clock
+        # The samples of each device, a string per family, are rendered when
+        # it is polled and the exposition is only joined on the next scrape.
+        self._samples: dict[str, list[str]] = {}
+        self._rendered: bytes | None = None
+        self._server: asyncio.Server | None = None
+        self._poller: asyncio.Task[None] | None = None
+
+    @property
+    def url(self) -> str:
+        """Return the url of the metrics endpoint."""
+        if self._server is None:
+            raise RuntimeError("The exporter is not running!")
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def update(self, result: FleetResult) -> None:
+        """Keep the result of a poll, the last device read on failures."""
+        labels = f"host={_quote(result.host)}"
+        samples = self._samples.get(result.host)
+        if result.device is not None:
+            samples = ["", "", *_device_samples(labels, result.device)]
+        elif samples is None:
+            samples = [""] * len(FAMILIES)
+        polled_at = self._clock()
+        samples[0] = f"ecoforest_up{{{labels}}} {int(result.error is None)}\n"
+        samples[1] = f"ecoforest_last_poll_timestamp_seconds{{{labels}}} {polled_at}\n"
+        self._samples[result.host] = samples
+        self._rendered = None
+
+    def render(self) -> bytes:
+        """Return the metrics of the last readings."""
+        if self._rendered is None:
+            lines = []
+            for index, header in enumerate(_HEADERS):
+                lines.append(header)
+                lines.extend(samples[index] for samples in self._samples.values())
+            lines.append("# EOF\n")
+            self._rendered = "".join(lines).encode()
+        return self._rendered
+
+    async def start(self) -> None:
+        """Start polling the devices and serving the metrics."""
+        self._server = await asyncio.start_server(self._serve, self._host, self._port)
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop polling the devices and serving the metrics."""
+        if self._poller is not None:
+            self._poller.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._poller
+            self._poller = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> MetricsExporter:
+        """Start the exporter on entering the context."""
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the exporter on exiting the context."""
+        await self.stop()
+
+    async def _poll(self) -> None:
+        """Keep the results of the scheduler polls."""
+        async for result in self._scheduler.run():
+            self.update(result)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the requests of a keep-alive connection."""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                method, path, _ = head.split(b" ", 2)
+                if method == b"GET" and path.split(b"?")[0] == b"/metrics":
+                    status, body = HTTPStatus.OK, self.render()
+                else:
+                    status, body = HTTPStatus.NOT_FOUND, b""
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {CONTENT_TYPE}\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+
+def _device_samples(labels: str, device: Device) -> list[str]:
+    """Return the samples of the device families, a string per family."""
+    samples = [
+        f"ecoforest_device_info{{{labels},"
+        f"serial_number={_quote(device.serial_number)},"
+        f"model={_quote(device.model)},"
+        f"model_name={_quote(device.model_name)},"
+        f"firmware={_quote(device.firmware)}}} 1\n"
+    ]
+    for name in GAUGE_FIELDS:
+        value = getattr(device, name)
+        samples.append(
+            "" if value is None else f"ecoforest_{name}{{{labels}}} {float(value)}\n"
+        )
+    for name, enum in STATESET_FIELDS.items():
+        current = getattr(device, name)
+        samples.append(
+            "".join(
+                f"ecoforest_{name}{{{labels},ecoforest_{name}={_quote(member.value)}}}"
+                f" {int(member is current)}\n"
+                for member in enum
+            )
+        )
+    return samples
+
+
+def _quote(value: str) -> str:
+    """Return a label value quoted and escaped."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+async def _main(args: argparse.Namespace) -> None:
+    """Serve the metrics of the devices until interrupted."""
+    auth = httpx.BasicAuth(args.username, args.password) if args.username else None
+    apis = {host: EcoforestApi(host, auth) for host in args.device}
+    async with MetricsExporter(
+        PollScheduler(apis, min_interval=args.min_interval),
+        args.host,
+        args.port,
+    ) as exporter:
+        print(exporter.url)
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("device", nargs="+", help="url of a device")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9423)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--min-interval", type=float, default=5.0)
+    asyncio.run(_main(parser.parse_args()))
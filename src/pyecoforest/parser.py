@@ -0,0 +1,31 @@
+"""Parser for the ecoforest CGI replies."""
+from __future__ import annotations
+
+from collections.abc import Container
+
+
+def parse(
+    content: bytes, encoding: str = "utf-8", keys: Container[str] | None = None
+) -> dict[str, str]:
+    """
+    Parse the key=value lines of a device reply and return as dictionary.
+
+    The reply is decoded once and scanned in a single pass; splitting each
+    line in C is faster in CPython than decoding the keys one by one.
+    Values may contain "=", only the first one separates key from value.
+    When keys is given only those keys are kept in the reply.
+    """
+    lines = content.decode(encoding, "replace").split("\n")
+    # The last line is not terminated and holds garbage, e.g. "0%".
+    lines.pop()
+    reply = {}
+    for line in lines:
+        key, separator, value = line.partition("=")
+        # discard lines without pairs
+        if not separator:
+            continue
+        # Remove all white spaces from bad response from ecoforest ...
+        key = key.replace(" ", "")
+        if keys is None or key in keys:
+            reply[key] = value
+    return reply
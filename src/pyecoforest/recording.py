@@ -0,0 +1,159 @@
+"""Recording and offline replay of the ecoforest device traffic."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import gzip
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from http import HTTPStatus
+from itertools import cycle
+from pathlib import Path
+from typing import IO, cast
+from urllib.parse import parse_qsl
+
+import httpx
+
+from . import ssl
+from .const import LOCAL_LIMITS, URL_CGI
+
+
+@dataclass
+class Exchange:
+    """Model for a recorded request to a device and its reply."""
+
+    host: str
+    operation: int | None
+    request: str
+    status: int
+    reply: str
+    # seconds since the recording started
+    started_at: float
+    duration: float
+    # type of the transport error raised instead of a reply, e.g. ReadTimeout
+    error: str | None = None
+
+
+def read_exchanges(path: str | Path) -> Iterator[Exchange]:
+    """Yield the exchanges of a recording file."""
+    with _open(path, "r") as file:
+        for line in file:
+            yield Exchange(**json.loads(line))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Class for recording the device requests sent through a transport."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        transport: httpx.AsyncBaseTransport | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # Same defaults as the client the api creates for itself.
+        self._transport = transport or httpx.AsyncHTTPTransport(
+            verify=ssl.NO_VERIFY_SSL_CONTEXT, limits=LOCAL_LIMITS
+        )  # nosec
+        self._file = _open(path, "w")
+        self._clock = clock
+        self._started_at = clock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request and record it with its reply or error."""
+        if request.url.path != URL_CGI:
+            return await self._transport.handle_async_request(request)
+
+        body = (await request.aread()).decode()
+        exchange = Exchange(
+            host=request.url.host,
+            operation=_operation(body),
+            request=body,
+            status=0,
+            reply="",
+            started_at=self._clock() - self._started_at,
+            duration=0.0,
+        )
+        # Cancelled requests and errors other than transport ones never
+        # reached the device and aren't recorded.
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+        except httpx.TransportError as error:
+            exchange.error = type(error).__name__
+            self._write(exchange)
+            raise
+        else:
+            exchange.status = response.status_code
+            exchange.reply = response.text
+            self._write(exchange)
+        return response
+
+    async def aclose(self) -> None:
+        """Close the recording file and the wrapped transport."""
+        self._file.close()
+        await self._transport.aclose()
+
+    def _write(self, exchange: Exchange) -> None:
+        """Write a finished exchange, flushed so a crash doesn't lose it."""
+        exchange.duration = self._clock() - self._started_at - exchange.started_at
+        self._file.write(json.dumps(dataclasses.asdict(exchange)) + "\n")
+        self._file.flush()
+
+
+# Requests are answered with the recorded replies of the same host and
+# operation in recording order, starting over once every reply was used.
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Class for answering device requests from a recording, without sockets."""
+
+    def __init__(
+        self,
+        exchanges: Iterable[Exchange] | str | Path,
+        speed: float | None = 1.0,
+    ) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("The replay speed must be positive!")
+        if isinstance(exchanges, (str, Path)):
+            exchanges = read_exchanges(exchanges)
+        recorded: dict[tuple[str, int | None], list[Exchange]] = {}
+        for exchange in exchanges:
+            recorded.setdefault((exchange.host, exchange.operation), []).append(
+                exchange
+            )
+        self._replies = {key: cycle(value) for key, value in recorded.items()}
+        # None replays every reply at once, otherwise the recorded latency is
+        # replayed divided by the speed.
+        self._speed = speed
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer the request with the next recorded reply."""
+        body = (await request.aread()).decode()
+        replies = self._replies.get((request.url.host, _operation(body)))
+        if replies is None or request.url.path != URL_CGI:
+            return httpx.Response(HTTPStatus.NOT_FOUND)
+
+        exchange = next(replies)
+        if self._speed is not None:
+            await asyncio.sleep(exchange.duration / self._speed)
+        if exchange.error is not None:
+            error = getattr(httpx, exchange.error, None)
+            if not (
+                isinstance(error, type) and issubclass(error, httpx.TransportError)
+            ):
+                error = httpx.TransportError
+            raise error(f"Replayed {exchange.error}", request=request)
+        return httpx.Response(exchange.status, text=exchange.reply)
+
+
+def _operation(body: str) -> int | None:
+    """Return the operation code of a request body."""
+    operation = dict(parse_qsl(body)).get("idOperacion")
+    return int(operation) if operation else None
+
+
+def _open(path: str | Path, mode: str) -> IO[str]:
+    """Open a recording file, gzip compressed when its name ends in .gz."""
+    if Path(path).suffix == ".gz":
+        return cast(IO[str], gzip.open(path, f"{mode}t", encoding="utf-8"))
+    return Path(path).open(mode, encoding="utf-8")
@@ -0,0 +1,82 @@
+"""Retry and circuit breaker policies for the ecoforest devices."""
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+
+from .exceptions import EcoforestCircuitOpenError
+
+
+@dataclass
+class RetryPolicy:
+    """Model for retrying failed requests with capped exponential backoff."""
+
+    # total attempts, including the first one
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    # ratio of the delay randomly shaved off so clients don't retry in sync
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait before the given retry attempt."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1)  # noqa: S311
+
+
+class CircuitState(Enum):
+    """Model that represents the state of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Class for failing fast while a device is known to be down."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the state of the circuit."""
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if self._clock() - self._opened_at < self._reset_timeout:
+            return CircuitState.OPEN
+        # let requests through to probe if the device is back
+        return CircuitState.HALF_OPEN
+
+    def check(self) -> None:
+        """Raise if the circuit is open."""
+        if self.state is CircuitState.OPEN:
+            raise EcoforestCircuitOpenError(
+                "The device is unavailable, not sending the request."
+            )
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the circuit over the threshold."""
+        self._failures += 1
+        if (
+            self._failures >= self._failure_threshold
+            or self.state is CircuitState.HALF_OPEN
+        ):
+            self._opened_at = self._clock()
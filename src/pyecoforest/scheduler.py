@@ -0,0 +1,122 @@
+"""Adaptive poll scheduler for ecoforest devices."""
+from __future__ import annotations
+
+import asyncio
+import random
+from collections.abc import AsyncIterator, Mapping, Sequence
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.fleet import FleetResult
+from pyecoforest.models.device import Device, State
+
+# Seconds between polls for each state, steady states barely change while
+# transitions and alarms change fast.
+DEFAULT_INTERVALS = {
+    State.OFF: 300.0,
+    State.STAND_BY: 300.0,
+    State.ON: 60.0,
+    State.SHUTTING_DOWN: 30.0,
+    State.STARTING: 10.0,
+    State.PRE_HEATING: 10.0,
+    State.ALARM: 10.0,
+}
+
+# Sensors used to measure how much the readings moved between polls.
+DEFAULT_MOVEMENT_FIELDS = (
+    "environment_temperature",
+    "gas_temperature",
+    "depression",
+    "extractor",
+    "convecto_air_flow",
+)
+
+
+# Connections are kept alive between polls for LOCAL_LIMITS.keepalive_expiry,
+# 900s. Jittered intervals longer than it, e.g. from a max_interval raised
+# above 800s, open a new connection, and pay the TLS handshake, on every poll.
+class PollScheduler:
+    """Class for polling devices at an interval adapted to their state."""
+
+    def __init__(
+        self,
+        apis: Mapping[str, EcoforestApi],
+        intervals: Mapping[State, float] | None = None,
+        min_interval: float = 5.0,
+        max_interval: float = 600.0,
+        error_interval: float = 60.0,
+        jitter: float = 0.1,
+        movement_threshold: float = 0.05,
+        movement_fields: Sequence[str] = DEFAULT_MOVEMENT_FIELDS,
+    ) -> None:
+        self._apis = dict(apis)
+        self._intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._error_interval = error_interval
+        self._jitter = jitter
+        self._movement_threshold = movement_threshold
+        self._movement_fields = movement_fields
+
+    def next_interval(self, previous: Device | None, current: Device) -> float:
+        """Return the seconds to wait before polling the device again."""
+        if previous is not None and previous.state != current.state:
+            # poll transitions as fast as allowed
+            interval = self._min_interval
+        else:
+            interval = self._intervals[current.state]
+            if (
+                previous is not None
+                and self._movement(previous, current) >= self._movement_threshold
+            ):
+                interval /= 2
+        return self._jittered(interval)
+
+    async def run(self) -> AsyncIterator[FleetResult]:
+        """Poll every device forever and yield the results as they complete."""
+        results: asyncio.Queue[FleetResult] = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._poll(host, api, results))
+            for host, api in self._apis.items()
+        ]
+        try:
+            while True:
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _poll(
+        self, host: str, api: EcoforestApi, results: asyncio.Queue[FleetResult]
+    ) -> None:
+        """Poll a single device, waiting the adapted interval between polls."""
+        # Spread the first polls so a fleet doesn't poll in sync.
+        await asyncio.sleep(random.uniform(0, self._min_interval))  # noqa: S311
+        previous = None
+        while True:
+            try:
+                device = await api.get()
+            except Exception as error:
+                await results.put(FleetResult(host, error=error))
+                await asyncio.sleep(self._jittered(self._error_interval))
+                continue
+
+            await results.put(FleetResult(host, device=device))
+            await asyncio.sleep(self.next_interval(previous, device))
+            previous = device
+
+    def _movement(self, previous: Device, current: Device) -> float:
+        """Return the largest relative change of the movement fields."""
+        movement = 0.0
+        for name in self._movement_fields:
+            before = getattr(previous, name)
+            after = getattr(current, name)
+            if before is None or after is None:
+                continue
+            movement = max(movement, abs(after - before) / max(abs(before), 1.0))
+        return movement
+
+    def _jittered(self, interval: float) -> float:
+        """Clamp the interval and spread it randomly by the jitter ratio."""
+        interval = min(max(interval, self._min_interval), self._max_interval)
+        spread = random.uniform(1 - self._jitter, 1 + self._jitter)  # noqa: S311
+        return interval * spread
@@ -0,0 +1,369 @@
+"""Simulator of ecoforest devices for load and benchmark testing."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import random
+import ssl
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from http import HTTPStatus
+from types import TracebackType
+from urllib.parse import parse_qsl
+
+import httpx
+
+from .const import (
+    API_ALARMS_OP,
+    API_SET_POWER_OP,
+    API_SET_STATE_OP,
+    API_SET_TEMP_OP,
+    API_STATS_OP,
+    API_STATUS_OP,
+    URL_CGI,
+)
+
+
+@dataclass
+class SimulatorConfig:
+    """Model for the behaviour of the simulated devices."""
+
+    # seconds to answer a request, picked uniformly between both values
+    min_latency: float = 0.0
+    max_latency: float = 0.0
+    # ratio of requests answered with an internal server error
+    error_rate: float = 0.0
+    # connections served at once, further connections get 503
+    max_connections: int | None = None
+    # seconds spent in each phase of the ignition and shutdown
+    starting_time: float = 60.0
+    pre_heating_time: float = 120.0
+    shutting_down_time: float = 90.0
+    # credentials required by the device, None to allow anonymous requests
+    username: str | None = None
+    password: str | None = None
+
+
+class SimulatedStove:
+    """Class for simulating the state of an ecoforest device."""
+
+    def __init__(
+        self,
+        serial_number: str = "000025568680000",
+        config: SimulatorConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.serial_number = serial_number
+        self.config = config or SimulatorConfig()
+        self.on = False
+        self.power = 3
+        self.temperature = 20.5
+        self.operation_mode = 0
+        self.alarm: str | None = None
+        self.working_hours = 6826
+        self.ignitions = 1152
+        self._clock = clock
+        # time of the last turn on or off, None while it was never switched
+        self._switched_at: float | None = None
+
+    @property
+    def state(self) -> int:
+        """Return the state code of the device at the current time."""
+        if self.alarm is not None:
+            return -4
+        if self._switched_at is None:
+            return 7 if self.on else 0
+
+        elapsed = self._clock() - self._switched_at
+        if not self.on:
+            return 8 if elapsed < self.config.shutting_down_time else 0
+        if elapsed < self.config.starting_time:
+            return 1
+        if elapsed < self.config.starting_time + self.config.pre_heating_time:
+            return 5
+        return 7
+
+    def turn(self, on: bool) -> None:
+        """Turn the device on or off, starting the ignition or shutdown."""
+        if on != self.on:
+            self.on = on
+            self._switched_at = self._clock()
+            if on:
+                self.ignitions += 1
+
+    def handle(self, form: dict[str, str]) -> str:
+        """Return the reply of the device to a CGI request."""
+        operation = int(form.get("idOperacion", 0))
+        if operation == API_STATUS_OP:
+            return self._status()
+        if operation == API_STATS_OP:
+            return self._stats()
+        if operation == API_ALARMS_OP:
+            return f"error_get_alarmas=0\nget_alarmas={self.alarm or 'N'}\n0%"
+        if operation == API_SET_STATE_OP:
+            self.turn(form.get("on_off") == "1")
+            return ""
+        if operation == API_SET_POWER_OP:
+            self.power = int(form["potencia"])
+            return "hemos chegado set power 1\n1\nerror_set_potencia=0\n0%"
+        if operation == API_SET_TEMP_OP:
+            self.temperature = float(form["temperatura"])
+            return "error_set_temperatura_consigna=0\n0%"
+        return "0%"
+
+    def _status(self) -> str:
+        """Return the status reply."""
+        return (
+            f"error_MODO_on_off=0\n"
+            f"on_off={int(self.on)}\n"
+            f"modo_operacion={self.operation_mode}\n"
+            f"modo_func=1\n"
+            f"estado={self.state}\n"
+            f"consigna_potencia={self.power}\n"
+            f"consigna_temperatura={self.temperature}\n"
+            f"temperatura={self._environment_temperature():.1f}\n"
+            f"temperatura_ext=---.-\n"
+            f"0%"
+        )
+
+    def _stats(self) -> str:
+        """Return the stats reply, the device prefixes most keys with spaces."""
+        burning = self.state in (1, 5, 7)
+        gas_temperature = 28.1 + (40.0 * self.power if burning else 0.0)
+        pulse = random.uniform(1.0, 1.5)  # noqa: S311
+        live_pulse = pulse * self.power if burning else 0.0
+        pairs = {
+            "Rt": "-30.0",
+            "Fu": "02",
+            "Pa": "-0.7",
+            "Ni": str(self.power if burning else 0),
+            "Es": str(self.state if burning else 0),
+            "Pn": f"{live_pulse:.1f}",
+            "Pf": "0.0",
+            "Th": f"{gas_temperature:.1f}",
+            "Tp": "32.3",
+            "Tn": f"{25 + (5 if burning else 0)}",
+            "Da": "002",
+            "Ex": f"{1200.0 if burning else 0.0}",
+            "Ne": f"{self.ignitions:06d}",
+            "Nh": f"{self.working_hours:09d}",
+            "Dp": "144.2",
+            "Co": f"{50.0 if burning else 0.0}",
+            "Re": "0",
+            "Ta": "24.1",
+            "Ns": self.serial_number,
+            "Me": "CC2014_v2",
+            " Vs": "30Abr19_v2z",
+            "Am": "0.000",
+        }
+        lines = "".join(f" {key}={value}\n" for key, value in pairs.items())
+        return f"error_get_menu2=0\n{lines} pC=P"
+
+    def _environment_temperature(self) -> float:
+        """Return the room temperature, warming up while the stove burns."""
+        return 23.5 + (1.0 if self.state == 7 else 0.0)
+
+
+class StoveServer:
+    """Class for serving a simulated device over HTTP or HTTPS."""
+
+    def __init__(
+        self,
+        stove: SimulatedStove,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ssl_context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.stove = stove
+        self._host = host
+        self._port = port
+        self._ssl_context = ssl_context
+        self._server: asyncio.Server | None = None
+        self._connections = 0
+
+    @property
+    def url(self) -> str:
+        """Return the base url of the device."""
+        if self._server is None:
+            raise RuntimeError("The simulator is not running!")
+        host, port = self._server.sockets[0].getsockname()[:2]
+        scheme = "https" if self._ssl_context else "http"
+        return f"{scheme}://{host}:{port}"
+
+    async def start(self) -> None:
+        """Start serving the device."""
+        self._server = await asyncio.start_server(
+            self._serve, self._host, self._port, ssl=self._ssl_context
+        )
+
+    async def stop(self) -> None:
+        """Stop serving the device."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> StoveServer:
+        """Start serving the device on entering the context."""
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop serving the device on exiting the context."""
+        await self.stop()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve the requests of a keep-alive connection."""
+        config = self.stove.config
+        self._connections += 1
+        try:
+            if config.max_connections and self._connections > config.max_connections:
+                await self._respond(writer, HTTPStatus.SERVICE_UNAVAILABLE, "")
+                return
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    return
+                headers, body = request
+                status, reply = await respond(
+                    self.stove, headers.get("authorization"), body
+                )
+                await self._respond(writer, status, reply)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, status: HTTPStatus, reply: str
+    ) -> None:
+        """Write an HTTP response."""
+        payload = reply.encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: text/plain\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+
+
+class SimulatorTransport(httpx.AsyncBaseTransport):
+    """Class for serving simulated devices in process, without sockets."""
+
+    def __init__(self, stoves: dict[str, SimulatedStove]) -> None:
+        # stoves keyed by the host of their url, e.g. "stove-1" or "10.0.0.1"
+        self.stoves = stoves
+        self._connections: dict[str, int] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer the request with the simulated device of its host."""
+        host = request.url.host
+        stove = self.stoves.get(host)
+        if stove is None or request.url.path != URL_CGI:
+            return httpx.Response(HTTPStatus.NOT_FOUND)
+
+        max_connections = stove.config.max_connections
+        if max_connections and self._connections.get(host, 0) >= max_connections:
+            return httpx.Response(HTTPStatus.SERVICE_UNAVAILABLE)
+        self._connections[host] = self._connections.get(host, 0) + 1
+        try:
+            status, reply = await respond(
+                stove, request.headers.get("authorization"), await request.aread()
+            )
+        finally:
+            self._connections[host] -= 1
+        return httpx.Response(status, text=reply)
+
+
+async def respond(
+    stove: SimulatedStove, authorization: str | None, body: bytes
+) -> tuple[HTTPStatus, str]:
+    """Return the status and reply of a simulated device to a CGI request."""
+    config = stove.config
+    if config.username is not None:
+        expected = base64.b64encode(
+            f"{config.username}:{config.password or ''}".encode()
+        ).decode()
+        if authorization != f"Basic {expected}":
+            return HTTPStatus.UNAUTHORIZED, ""
+
+    if config.max_latency:
+        await asyncio.sleep(
+            random.uniform(config.min_latency, config.max_latency)  # noqa: S311
+        )
+    if config.error_rate and random.random() < config.error_rate:  # noqa: S311
+        return HTTPStatus.INTERNAL_SERVER_ERROR, ""
+    return HTTPStatus.OK, stove.handle(dict(parse_qsl(body.decode())))
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> tuple[dict[str, str], bytes] | None:
+    """Read the headers and body of an HTTP request, None when closed."""
+    head = await reader.readuntil(b"\r\n\r\n") if not reader.at_eof() else b""
+    if not head:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        if key:
+            headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return headers, body
+
+
+async def start_fleet(
+    count: int,
+    config: SimulatorConfig | None = None,
+    host: str = "127.0.0.1",
+    ssl_context: ssl.SSLContext | None = None,
+) -> list[StoveServer]:
+    """Start serving many simulated devices, each one on its own port."""
+    servers = [
+        StoveServer(SimulatedStove(f"{i:015d}", config), host, ssl_context=ssl_context)
+        for i in range(count)
+    ]
+    await asyncio.gather(*(server.start() for server in servers))
+    return servers
+
+
+async def _main(args: argparse.Namespace) -> None:
+    """Serve the simulated devices until interrupted."""
+    ssl_context = None
+    if args.certfile:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.certfile, args.keyfile)
+    config = SimulatorConfig(
+        min_latency=args.min_latency,
+        max_latency=args.max_latency,
+        error_rate=args.error_rate,
+        max_connections=args.max_connections,
+    )
+    servers = await start_fleet(args.count, config, args.host, ssl_context)
+    for server in servers:
+        print(server.url)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--min-latency", type=float, default=0.0)
+    parser.add_argument("--max-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-connections", type=int)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    asyncio.run(_main(parser.parse_args()))
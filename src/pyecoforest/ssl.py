@@ -1,5 +1,7 @@
 import contextlib
 import ssl
+from collections.abc import Callable
+from typing import Any
 
 
 def create_no_verify_ssl_context() -> ssl.SSLContext:
@@ -23,12 +25,22 @@ def create_no_verify_ssl_context() -> ssl.SSLContext:
     return sslcontext
 
 
-NO_VERIFY_SSL_CONTEXT = create_no_verify_ssl_context()
-
-
 def create_default_ssl_context() -> ssl.SSLContext:
     """Return an default SSL context."""
     return ssl.create_default_context()
 
 
-SSL_CONTEXT = create_default_ssl_context()
+# Loading the CA certificates is slow, the contexts are only created when
+# first used rather than on import.
+_CONTEXTS: dict[str, Callable[[], ssl.SSLContext]] = {
+    "NO_VERIFY_SSL_CONTEXT": create_no_verify_ssl_context,
+    "SSL_CONTEXT": create_default_ssl_context,
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Create the shared SSL contexts on first access."""
+    if name in _CONTEXTS:
+        context = globals()[name] = _CONTEXTS[name]()
+        return context
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,287 @@
+"""SQLite store of the ecoforest device readings."""
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Iterable, Sequence
+from enum import Enum
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from pyecoforest.exceptions import EcoforestError
+from pyecoforest.models.device import (
+    FIELD_TYPES,
+    Alarm,
+    Device,
+    OperationMode,
+    State,
+)
+
+# Fields that don't change between readings, stored once per device version.
+STATIC_FIELDS = ("model", "model_name", "firmware", "is_supported")
+
+# Fields stored with every reading.
+READING_FIELDS = tuple(
+    name for name in FIELD_TYPES if name not in ("serial_number", *STATIC_FIELDS)
+)
+
+# Version of the layout of the tables, kept as the user_version of the
+# database. Device fields added later are added as columns when opened.
+SCHEMA_VERSION = 1
+
+_SQL_TYPES = {"bool": "INTEGER", "int": "INTEGER", "float": "REAL", "str": "TEXT"}
+_ENUMS: dict[str, type[Enum]] = {
+    "operation_mode": OperationMode,
+    "state": State,
+    "alarm": Alarm,
+}
+
+# The column names come from the Device fields, never from the caller, so
+# the statements built from them are safe. They are quoted as some of them,
+# e.g. on, are SQL keywords.
+_STATIC_COLUMNS = ", ".join(f'"{name}"' for name in STATIC_FIELDS)
+_READING_COLUMNS = ", ".join(f'"{name}"' for name in READING_FIELDS)
+# Each reading points to the version of the static fields it was read with,
+# so a firmware update doesn't rewrite the older readings.
+_SCHEMA = f"""
+CREATE TABLE devices (
+    id INTEGER PRIMARY KEY,
+    serial_number TEXT NOT NULL UNIQUE
+);
+CREATE TABLE versions (
+    id INTEGER PRIMARY KEY,
+    device_id INTEGER NOT NULL REFERENCES devices (id),
+    valid_from REAL NOT NULL,
+    {", ".join(f'"{name}" {_SQL_TYPES[FIELD_TYPES[name]]}' for name in STATIC_FIELDS)}
+);
+CREATE INDEX versions_device ON versions (device_id, id);
+CREATE TABLE readings (
+    device_id INTEGER NOT NULL REFERENCES devices (id),
+    timestamp REAL NOT NULL,
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    {", ".join(f'"{name}" {_SQL_TYPES[FIELD_TYPES[name]]}' for name in READING_FIELDS)},
+    PRIMARY KEY (device_id, timestamp)
+) WITHOUT ROWID;
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+
+class SnapshotStore:
+    """Class for storing device readings, indexed by device and time."""
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        self._connection = sqlite3.connect(path)
+        # Readers don't block the poller appending readings.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._migrate(path)
+        # device and version ids by serial number, with the static fields of
+        # the version
+        self._devices: dict[str, tuple[int, int, tuple[Any, ...]]] = {}
+
+    def add(self, device: Device, timestamp: float | None = None) -> None:
+        """Store a reading."""
+        self.add_many([(device, time.time() if timestamp is None else timestamp)])
+
+    def add_many(self, readings: Iterable[tuple[Device, float]]) -> None:
+        """Store many readings in a single transaction."""
+        try:
+            with self._connection:
+                rows = [
+                    (*self._version(device, timestamp), timestamp, *_values(device))
+                    for device, timestamp in readings
+                ]
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO readings "  # noqa: S608
+                    f"(device_id, version_id, timestamp, {_READING_COLUMNS}) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(READING_FIELDS))})",
+                    rows,
+                )
+        except BaseException:
+            # the ids of the rolled back devices and versions are gone
+            self._devices.clear()
+            raise
+
+    def serial_numbers(self) -> list[str]:
+        """Return the serial numbers of the stored devices."""
+        rows = self._connection.execute(
+            "SELECT serial_number FROM devices ORDER BY serial_number"
+        )
+        return [serial_number for (serial_number,) in rows]
+
+    def readings(
+        self,
+        serial_number: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[tuple[float, Device]]:
+        """Return the readings of a device between start and end, inclusive."""
+        rows = self._connection.execute(
+            f"SELECT timestamp, {_STATIC_COLUMNS}, {_READING_COLUMNS} "  # noqa: S608
+            "FROM readings JOIN versions ON versions.id = readings.version_id "
+            "WHERE readings.device_id = "
+            "(SELECT id FROM devices WHERE serial_number = ?) "
+            "AND timestamp BETWEEN ? AND ? ORDER BY timestamp",
+            (serial_number, *_range(start, end)),
+        )
+        names = STATIC_FIELDS + READING_FIELDS
+        return [
+            (
+                timestamp,
+                Device(
+                    serial_number=serial_number,
+                    **{name: _load(name, value) for name, value in zip(names, values)},
+                ),
+            )
+            for timestamp, *values in rows
+        ]
+
+    def downsample(
+        self,
+        serial_number: str,
+        interval: float,
+        fields: Sequence[str],
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[tuple[float, dict[str, float | None]]]:
+        """Return the mean of numeric fields over buckets of interval seconds."""
+        unknown = set(fields) - {
+            name for name in READING_FIELDS if FIELD_TYPES[name] in ("int", "float")
+        }
+        if unknown:
+            raise ValueError(f"The fields {sorted(unknown)} are not numeric!")
+        averages = ", ".join(f'AVG("{name}")' for name in fields)
+        rows = self._connection.execute(
+            f"SELECT CAST(timestamp / ? AS INTEGER) * ? AS bucket, {averages} "  # noqa: S608
+            "FROM readings WHERE device_id = "
+            "(SELECT id FROM devices WHERE serial_number = ?) "
+            "AND timestamp BETWEEN ? AND ? GROUP BY bucket ORDER BY bucket",
+            (interval, interval, serial_number, *_range(start, end)),
+        )
+        return [(bucket, dict(zip(fields, values))) for bucket, *values in rows]
+
+    def delta(
+        self,
+        serial_number: str,
+        field: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> float | None:
+        """Return the change of a counter, e.g. working_hours, over a range."""
+        if field not in READING_FIELDS or FIELD_TYPES[field] not in ("int", "float"):
+            raise ValueError(f"The field {field} is not numeric!")
+        row = self._connection.execute(
+            f"WITH device_readings AS ("  # noqa: S608
+            f'SELECT timestamp, "{field}" AS value FROM readings WHERE device_id = '
+            "(SELECT id FROM devices WHERE serial_number = ?) "
+            f'AND timestamp BETWEEN ? AND ? AND "{field}" IS NOT NULL) '
+            "SELECT "
+            "(SELECT value FROM device_readings ORDER BY timestamp DESC LIMIT 1) - "
+            "(SELECT value FROM device_readings ORDER BY timestamp LIMIT 1)",
+            (serial_number, *_range(start, end)),
+        ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self) -> SnapshotStore:
+        """Enter the store context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the store context closing the database."""
+        self.close()
+
+    def _migrate(self, path: str | Path) -> None:
+        """Create the tables, or check their version and add new columns."""
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            tables = self._connection.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'table'"
+            ).fetchone()[0]
+            if tables:
+                raise EcoforestError(f"The database {path} has an unknown schema!")
+            self._connection.executescript(_SCHEMA)
+        elif version != SCHEMA_VERSION:
+            raise EcoforestError(
+                f"The database {path} has schema version {version}, "
+                f"expected {SCHEMA_VERSION}!"
+            )
+
+        # fields added to Device since the database was created
+        columns = {
+            row[1] for row in self._connection.execute("PRAGMA table_info(readings)")
+        }
+        with self._connection:
+            for name in READING_FIELDS:
+                if name not in columns:
+                    self._connection.execute(
+                        f'ALTER TABLE readings ADD COLUMN "{name}" '
+                        f"{_SQL_TYPES[FIELD_TYPES[name]]}"
+                    )
+
+    def _version(self, device: Device, timestamp: float) -> tuple[int, int]:
+        """Return the device and version ids, adding a version when changed."""
+        static = tuple(getattr(device, name) for name in STATIC_FIELDS)
+        known = self._devices.get(device.serial_number)
+        if known is None:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO devices (serial_number) VALUES (?)",
+                (device.serial_number,),
+            )
+            row = self._connection.execute(
+                f"SELECT devices.id, versions.id, {_STATIC_COLUMNS} "  # noqa: S608
+                "FROM devices LEFT JOIN versions ON versions.device_id = devices.id "
+                "WHERE serial_number = ? ORDER BY versions.id DESC LIMIT 1",
+                (device.serial_number,),
+            ).fetchone()
+            device_id, version_id, *stored = row
+            known = (
+                device_id,
+                version_id,
+                tuple(_load(n, v) for n, v in zip(STATIC_FIELDS, stored)),
+            )
+        device_id, version_id, stored = known
+        if version_id is None or stored != static:
+            version_id = self._connection.execute(
+                f"INSERT INTO versions (device_id, valid_from, {_STATIC_COLUMNS}) "  # noqa: S608
+                f"VALUES (?, ?, {', '.join('?' * len(STATIC_FIELDS))})",
+                (device_id, timestamp, *static),
+            ).lastrowid
+        self._devices[device.serial_number] = (device_id, version_id, static)
+        return device_id, version_id
+
+
+def _values(device: Device) -> tuple[Any, ...]:
+    """Return the values of the reading fields, enums by their value."""
+    values = []
+    for name in READING_FIELDS:
+        value = getattr(device, name)
+        values.append(value.value if isinstance(value, Enum) else value)
+    return tuple(values)
+
+
+def _load(name: str, value: Any) -> Any:
+    """Convert a stored value back to the type of its device field."""
+    if value is None:
+        return None
+    if name in _ENUMS:
+        return _ENUMS[name](value)
+    if FIELD_TYPES[name] == "bool":
+        return bool(value)
+    return value
+
+
+def _range(start: float | None, end: float | None) -> tuple[float, float]:
+    """Return the bounds of a time range, open ends unbounded."""
+    return (
+        float("-inf") if start is None else start,
+        float("inf") if end is None else end,
+    )
@@ -0,0 +1,137 @@
+"""Blocking client for ecoforest devices, for threaded code."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from types import TracebackType
+from typing import Any, TypeVar
+
+import httpx
+
+from pyecoforest.api import EcoforestApi, Refresh
+from pyecoforest.models.device import Device
+
+_T = TypeVar("_T")
+
+
+class BackgroundLoop:
+    """Class for running an event loop forever in a daemon thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop, starting its thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="pyecoforest-loop", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coroutine: Coroutine[Any, Any, _T]) -> Future[_T]:
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, _T]) -> _T:
+        """Run a coroutine on the loop and block until it completes."""
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("Blocking calls can't be made from the loop thread!")
+        return self.submit(coroutine).result()
+
+    def stop(self) -> None:
+        """Stop the loop and wait for its thread to finish."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+# Loop shared by every blocking client, so the clients keep their connection
+# pools alive between calls.
+_SHARED_LOOP = BackgroundLoop()
+
+
+# The calls run on a long lived background event loop and can be made from
+# many threads at once.
+class EcoforestSyncApi:
+    """Class for communicating with an ecoforest device from blocking code."""
+
+    def __init__(
+        self,
+        host: str,
+        auth: httpx.BasicAuth | None = None,
+        loop: BackgroundLoop | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._loop = loop or _SHARED_LOOP
+        # The api, and its client, are created on the loop they will run on.
+        self._api = self._loop.run(self._create_api(host, auth, kwargs))
+
+    @property
+    def api(self) -> EcoforestApi:
+        """Return the asynchronous api the calls run on."""
+        return self._api
+
+    def get(self) -> Device:
+        """Retrieve ecoforest information from api."""
+        return self._loop.run(self._api.get())
+
+    def turn(self, on: bool | None = False, refresh: Refresh = Refresh.FULL) -> Device:
+        """Turn device on and off."""
+        return self._loop.run(self._api.turn(on, refresh))
+
+    def set_temperature(self, target: float, refresh: Refresh = Refresh.FULL) -> Device:
+        """Set device target temperature."""
+        return self._loop.run(self._api.set_temperature(target, refresh))
+
+    def set_power(self, target: int, refresh: Refresh = Refresh.FULL) -> Device:
+        """Set device target power."""
+        return self._loop.run(self._api.set_power(target, refresh))
+
+    def apply(
+        self,
+        on: bool | None = None,
+        temperature: float | None = None,
+        power: int | None = None,
+        refresh: Refresh = Refresh.FULL,
+    ) -> Device:
+        """Send several setpoint changes and refresh the device once."""
+        return self._loop.run(self._api.apply(on, temperature, power, refresh))
+
+    def close(self) -> None:
+        """Close the client if it was created by the api."""
+        self._loop.run(self._api.aclose())
+
+    def __enter__(self) -> EcoforestSyncApi:
+        """Enter the api context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the api context closing the client."""
+        self.close()
+
+    @staticmethod
+    async def _create_api(
+        host: str, auth: httpx.BasicAuth | None, kwargs: dict[str, Any]
+    ) -> EcoforestApi:
+        """Create the asynchronous api within the running loop."""
+        return EcoforestApi(host, auth, **kwargs)
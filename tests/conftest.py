@@ -0,0 +1,53 @@
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from pyecoforest.models.device import Alarm, Device, OperationMode, State
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    with open(FIXTURES / name) as read_in:
+        return read_in.read()
+
+
+def load_fixture_bytes(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+def make_device(**kwargs) -> Device:
+    device = Device(
+        is_supported=True,
+        firmware="firmware-version",
+        model="CC2014_v2",
+        model_name="Cordoba glass",
+        serial_number="serial-number",
+        operation_mode=OperationMode.POWER,
+        on=True,
+        state=State.ON,
+        power=5,
+        temperature=22.5,
+        alarm=Alarm.PELLETS,
+        alarm_code="A099",
+        gas_temperature=100.0,
+        working_hours=100,
+        ignitions=10,
+    )
+    return dataclasses.replace(device, **kwargs)
+
+
+class FakeClock:
+    """Clock returning a time the tests set, to pass as a clock argument."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    return FakeClock()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from pyecoforest.alarms import AlarmEvent, AlarmWatcher
+from pyecoforest.api import EcoforestApi
+from pyecoforest.models.device import Alarm, State
+from pyecoforest.simulator import SimulatedStove, SimulatorTransport
+
+
+def _watcher(stoves: dict[str, SimulatedStove], **kwargs) -> AlarmWatcher:
+    client = httpx.AsyncClient(transport=SimulatorTransport(stoves))
+    apis = {host: EcoforestApi(f"http://{host}", client=client) for host in stoves}
+    return AlarmWatcher(apis, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_poll_tracks_alarm_start_and_clear(clock):
+    stove = SimulatedStove()
+    watcher = _watcher({"stove": stove}, clock=clock)
+    assert await watcher.poll("stove") == []
+
+    stove.alarm = "A099"
+    clock.now = 10
+    started = AlarmEvent("stove", Alarm.PELLETS, "A099", 10, state=State.ALARM)
+    assert await watcher.poll("stove") == [started]
+    clock.now = 15
+    assert await watcher.poll("stove") == []
+    assert watcher.active == {"stove": started}
+
+    stove.alarm = "A012"
+    clock.now = 20
+    cleared, overheating = await watcher.poll("stove")
+    assert (cleared.code, cleared.started_at, cleared.cleared_at) == ("A099", 10, 20)
+    assert not cleared.active
+    assert (overheating.alarm, overheating.started_at) == (Alarm.CPU_OVERHEATING, 20)
+
+    stove.alarm = None
+    clock.now = 30
+    (cleared,) = await watcher.poll("stove")
+    assert (cleared.code, cleared.cleared_at, cleared.state) == ("A012", 30, State.OFF)
+    assert watcher.active == {}
+
+
+@pytest.mark.asyncio
+async def test_run_pushes_events_to_subscribers():
+    stoves = {f"stove-{i}": SimulatedStove(f"{i:015d}") for i in range(3)}
+    stoves["stove-1"].alarm = "A001"
+    watcher = _watcher(stoves, interval=0.01)
+
+    async def first(count: int) -> list[AlarmEvent]:
+        events = []
+        async for event in watcher.subscribe():
+            events.append(event)
+            if len(events) == count:
+                return events
+        return events
+
+    subscribers = [asyncio.create_task(first(1)) for _ in range(2)]
+    await asyncio.sleep(0)
+    runner = asyncio.create_task(watcher.run())
+    try:
+        for events in await asyncio.wait_for(asyncio.gather(*subscribers), 5):
+            assert [(e.host, e.alarm) for e in events] == [
+                ("stove-1", Alarm.AIR_DEPRESSION)
+            ]
+    finally:
+        runner.cancel()
+
+
+@pytest.mark.asyncio
+async def test_run_warns_once_when_a_device_starts_failing(caplog):
+    transport = SimulatorTransport({})
+    client = httpx.AsyncClient(transport=transport)
+    api = EcoforestApi("http://stove", client=client)
+    watcher = AlarmWatcher({"stove": api}, interval=0.01, error_interval=0.01)
+
+    caplog.set_level(logging.DEBUG, logger="pyecoforest.alarms")
+    runner = asyncio.create_task(watcher.run())
+    try:
+        await asyncio.sleep(0.1)
+        transport.stoves["stove"] = SimulatedStove()
+        await asyncio.sleep(0.1)
+    finally:
+        runner.cancel()
+
+    levels = [record.levelno for record in caplog.records]
+    assert levels.count(logging.WARNING) == 1
+    assert levels.count(logging.DEBUG) > 0
+    assert levels[-1] == logging.INFO
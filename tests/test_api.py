@@ -1,10 +1,11 @@
-from pathlib import Path
+import asyncio
 
 import httpx
 import pytest
 import respx
 
-from pyecoforest.api import EcoforestApi
+from pyecoforest.api import ConnectionStats, EcoforestApi, Refresh
+from pyecoforest.cache import CacheInfo
 from pyecoforest.const import (
     API_ALARMS_OP,
     API_SET_POWER_OP,
@@ -16,22 +17,18 @@ from pyecoforest.const import (
 )
 from pyecoforest.exceptions import (
     EcoforestAuthenticationRequired,
+    EcoforestCircuitOpenError,
     EcoforestConnectionError,
 )
-from pyecoforest.models.device import Device, OperationMode, State
+from pyecoforest.metrics import InMemoryMetrics
+from pyecoforest.models.device import Device, LazyDevice, OperationMode, State
+from pyecoforest.retry import CircuitBreaker, RetryPolicy
 
-
-def _fixtures_dir() -> Path:
-    return Path(__file__).parent / "fixtures"
-
-
-def _load_fixture(name: str) -> str:
-    with open(_fixtures_dir() / name) as read_in:
-        return read_in.read()
+from .conftest import load_fixture
 
 
 def _mutate_fixture(name: str, pairs: list[tuple[str, str]]) -> str:
-    fixture = _load_fixture(name)
+    fixture = load_fixture(name)
     for k, v in pairs:
         fixture = fixture.replace(k, v)
     return fixture
@@ -48,13 +45,13 @@ async def test_get():
     """Get status information."""
     target = _get_target()
     respx.post(path=URL_CGI, data={"idOperacion": API_STATUS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1002-status.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1002-status.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_STATS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1020-stats.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1020-stats.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_ALARMS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1079-alarms.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1079-alarms.txt"))
     )
     actual = await target.get()
     assert actual is not None
@@ -84,6 +81,10 @@ async def test_get():
         extractor=0,
         working_level=0,
         convecto_air_flow=0.0,
+        ambient_temperature=24.1,
+        differential_pressure=144.2,
+        pressure=-0.7,
+        return_temperature=-30.0,
     )
 
 
@@ -142,14 +143,14 @@ async def test_set_temperature():
         )
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_STATS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1020-stats.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1020-stats.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_ALARMS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1079-alarms.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1079-alarms.txt"))
     )
     respx.post(
         path=URL_CGI, data={"idOperacion": API_SET_TEMP_OP, "temperatura": 23.5}
-    ).mock(return_value=httpx.Response(200, text=_load_fixture("op-1019-set-temp.txt")))
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1019-set-temp.txt")))
 
     actual = await target.set_temperature(23.5)
     assert actual is not None
@@ -179,6 +180,10 @@ async def test_set_temperature():
         extractor=0,
         working_level=0,
         convecto_air_flow=0.0,
+        ambient_temperature=24.1,
+        differential_pressure=144.2,
+        pressure=-0.7,
+        return_temperature=-30.0,
     )
 
 
@@ -196,16 +201,14 @@ async def test_set_power():
         )
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_STATS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1020-stats.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1020-stats.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_ALARMS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1079-alarms.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1079-alarms.txt"))
     )
     respx.post(
         path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
-    ).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1004-set-power.txt"))
-    )
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
 
     actual = await target.set_power(5)
     assert actual is not None
@@ -235,6 +238,10 @@ async def test_set_power():
         extractor=0,
         working_level=0,
         convecto_air_flow=0.0,
+        ambient_temperature=24.1,
+        differential_pressure=144.2,
+        pressure=-0.7,
+        return_temperature=-30.0,
     )
 
 
@@ -253,13 +260,13 @@ async def test_turn():
         )
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_STATS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1020-stats.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1020-stats.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_ALARMS_OP}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1079-alarms.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1079-alarms.txt"))
     )
     respx.post(path=URL_CGI, data={"idOperacion": API_SET_STATE_OP, "on_off": 1}).mock(
-        return_value=httpx.Response(200, text=_load_fixture("op-1004-set-power.txt"))
+        return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt"))
     )
 
     actual = await target.turn(True)
@@ -290,4 +297,407 @@ async def test_turn():
         extractor=0,
         working_level=0,
         convecto_air_flow=0.0,
+        ambient_temperature=24.1,
+        differential_pressure=144.2,
+        pressure=-0.7,
+        return_temperature=-30.0,
+    )
+
+
+def _slow_device(delay: float):
+    """Return a respx side effect serving fixtures after a delay."""
+    fixtures = {
+        str(API_STATUS_OP): "op-1002-status.txt",
+        str(API_STATS_OP): "op-1020-stats.txt",
+        str(API_ALARMS_OP): "op-1079-alarms.txt",
+    }
+    in_flight = {"current": 0, "peak": 0}
+
+    async def side_effect(request: httpx.Request) -> httpx.Response:
+        op = request.content.decode().split("=")[1]
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        await asyncio.sleep(delay)
+        in_flight["current"] -= 1
+        return httpx.Response(200, text=load_fixture(fixtures[op]))
+
+    return side_effect, in_flight
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_requests_run_concurrently():
+    """Get issues the status, stats and alarms requests at the same time."""
+    target = _get_target()
+    side_effect, in_flight = _slow_device(0.01)
+    respx.post(path=URL_CGI).mock(side_effect=side_effect)
+
+    actual = await target.get()
+    assert actual.serial_number == "000025568680000"
+    assert in_flight["peak"] == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_with_max_concurrency():
+    """Get respects the per device concurrency bound."""
+    target = EcoforestApi("http://127.0.0.1", max_concurrency=1)
+    side_effect, in_flight = _slow_device(0.01)
+    respx.post(path=URL_CGI).mock(side_effect=side_effect)
+
+    actual = await target.get()
+    assert actual.serial_number == "000025568680000"
+    assert in_flight["peak"] == 1
+
+
+def _mock_reads() -> tuple[respx.Route, respx.Route, respx.Route]:
+    """Mock the read operations with the fixtures."""
+    return (
+        respx.post(path=URL_CGI, data={"idOperacion": API_STATUS_OP}).mock(
+            return_value=httpx.Response(200, text=load_fixture("op-1002-status.txt"))
+        ),
+        respx.post(path=URL_CGI, data={"idOperacion": API_STATS_OP}).mock(
+            return_value=httpx.Response(200, text=load_fixture("op-1020-stats.txt"))
+        ),
+        respx.post(path=URL_CGI, data={"idOperacion": API_ALARMS_OP}).mock(
+            return_value=httpx.Response(200, text=load_fixture("op-1079-alarms.txt"))
+        ),
+    )
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_read_raw():
+    """Read the raw replies the device is built from."""
+    target = _get_target()
+    _mock_reads()
+    raw = await target.read_raw()
+    assert sorted(raw) == ["alarms", "stats", "status"]
+    assert raw["stats"]["Me"] == "CC2014_v2"
+    assert Device.build(raw) == await target.get()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_set_temperature_without_refresh():
+    """Set target temperature applying it to the last known state."""
+    target = _get_target()
+    status, stats, alarms = _mock_reads()
+    write = respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_TEMP_OP, "temperatura": 23.5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1019-set-temp.txt")))
+
+    await target.get()
+    actual = await target.set_temperature(23.5, refresh=Refresh.NONE)
+    assert actual.temperature == 23.5
+    assert actual.power == 3
+    assert write.call_count == 1
+    assert (status.call_count, stats.call_count, alarms.call_count) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_set_power_with_status_refresh():
+    """Set target power re-fetching only the status."""
+    target = _get_target()
+    status, stats, alarms = _mock_reads()
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
+
+    await target.get()
+    actual = await target.set_power(5, refresh=Refresh.STATUS)
+    # the mocked status still reports the old power
+    assert actual.power == 3
+    assert (status.call_count, stats.call_count, alarms.call_count) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_turn_without_refresh_and_failed_write():
+    """Fallback to a status refresh when the device reports a write error."""
+    target = _get_target()
+    status, stats, alarms = _mock_reads()
+    respx.post(path=URL_CGI, data={"idOperacion": API_SET_STATE_OP, "on_off": 1}).mock(
+        return_value=httpx.Response(200, text="error_MODO_on_off=1\n0%")
+    )
+
+    await target.get()
+    actual = await target.turn(True, refresh=Refresh.NONE)
+    assert actual.on is False
+    assert (status.call_count, stats.call_count, alarms.call_count) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_apply_without_last_state():
+    """Apply several setpoints with a single full refresh."""
+    target = _get_target()
+    status, stats, alarms = _mock_reads()
+    power = respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
+    temperature = respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_TEMP_OP, "temperatura": 21}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1019-set-temp.txt")))
+
+    actual = await target.apply(temperature=21, power=5, refresh=Refresh.NONE)
+    assert actual.serial_number == "000025568680000"
+    assert (power.call_count, temperature.call_count) == (1, 1)
+    assert (status.call_count, stats.call_count, alarms.call_count) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_lazy():
+    """Get a lazy device equal to the eagerly parsed one."""
+    target = EcoforestApi("http://127.0.0.1", lazy=True)
+    _mock_reads()
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
+
+    actual = await target.get()
+    assert isinstance(actual, LazyDevice)
+    assert actual == await _get_target().get()
+    actual = await target.set_power(5, refresh=Refresh.NONE)
+    assert isinstance(actual, LazyDevice)
+    assert actual.power == 5
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_with_cache_ttl():
+    """Get reuses the cached stats until a write invalidates them."""
+    target = EcoforestApi("http://127.0.0.1", cache_ttl={API_STATS_OP: 300})
+    status, stats, alarms = _mock_reads()
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
+
+    first = await target.get()
+    assert await target.get() == first
+    assert (status.call_count, stats.call_count, alarms.call_count) == (2, 1, 2)
+    assert target.cache_info == CacheInfo(hits=1, misses=1, size=1)
+
+    await target.set_power(5)
+    assert (status.call_count, stats.call_count, alarms.call_count) == (3, 2, 3)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_concurrent_get_share_in_flight_requests():
+    """Concurrent gets share the requests already in flight."""
+    target = _get_target()
+    side_effect, _ = _slow_device(0.01)
+    route = respx.post(path=URL_CGI).mock(side_effect=side_effect)
+
+    devices = await asyncio.gather(*(target.get() for _ in range(5)))
+    assert all(device == devices[0] for device in devices)
+    assert route.call_count == 3
+
+    await target.get()
+    assert route.call_count == 6
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_write_is_a_barrier_for_in_flight_reads():
+    """Reads started after a write never join a read started before it."""
+    target = _get_target()
+    side_effect, _ = _slow_device(0.01)
+    route = respx.post(path=URL_CGI, data__contains={"idOperacion": API_STATUS_OP})
+    route.mock(side_effect=side_effect)
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(return_value=httpx.Response(200, text=load_fixture("op-1004-set-power.txt")))
+
+    before = asyncio.create_task(target.status())
+    await asyncio.sleep(0)
+    await target._write(API_SET_POWER_OP, "potencia", 5)
+    after = asyncio.create_task(target.status())
+    await asyncio.gather(before, after)
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_write_is_a_barrier_for_reads_started_during_it():
+    """Reads started while a write is sent aren't used to refresh after it."""
+    target = _get_target()
+    device = {"power": "3"}
+
+    async def status(request: httpx.Request) -> httpx.Response:
+        # the device answers with the power it had when the read arrived
+        power = device["power"]
+        await asyncio.sleep(0.05)
+        return httpx.Response(
+            200,
+            text=_mutate_fixture(
+                "op-1002-status.txt",
+                [("consigna_potencia=3", f"consigna_potencia={power}")],
+            ),
+        )
+
+    async def set_power(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.02)
+        device["power"] = "5"
+        return httpx.Response(200, text=load_fixture("op-1004-set-power.txt"))
+
+    _mock_reads()
+    respx.post(path=URL_CGI, data={"idOperacion": API_STATUS_OP}).mock(
+        side_effect=status
+    )
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(side_effect=set_power)
+
+    write = asyncio.create_task(target.set_power(5))
+    await asyncio.sleep(0.01)
+    during = asyncio.create_task(target.get())
+    assert (await write).power == 5
+    assert (await during).power == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_shared_read_survives_cancelled_caller():
+    """Cancelling one caller doesn't cancel the read shared with others."""
+    target = _get_target()
+    side_effect, _ = _slow_device(0.01)
+    respx.post(path=URL_CGI).mock(side_effect=side_effect)
+
+    first = asyncio.create_task(target.status())
+    second = asyncio.create_task(target.status())
+    await asyncio.sleep(0)
+    first.cancel()
+    assert (await second)["estado"] == "0"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Transport that opens a single connection and reports it as traced."""
+
+    def __init__(self) -> None:
+        self.connected = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = request.extensions["trace"]
+        if not self.connected:
+            self.connected = True
+            await trace("connection.connect_tcp.complete", {})
+            await trace("connection.start_tls.complete", {})
+        return httpx.Response(200, text=load_fixture("op-1002-status.txt"))
+
+
+@pytest.mark.asyncio
+async def test_connection_stats():
+    """Connection stats count requests reusing an open connection."""
+    transport = TracingTransport()
+    async with EcoforestApi(
+        "https://127.0.0.1", client=httpx.AsyncClient(transport=transport)
+    ) as target:
+        await target.status()
+        await target.status()
+    assert target.connection_stats == ConnectionStats(
+        requests=2, connections=1, tls_handshakes=1
+    )
+    assert target.connection_stats.reused == 1
+
+
+@pytest.mark.asyncio
+async def test_aclose_only_closes_own_client():
+    """Closing the api leaves a client given by the caller open."""
+    client = httpx.AsyncClient()
+    async with EcoforestApi("http://127.0.0.1", client=client):
+        pass
+    assert not client.is_closed
+
+    target = EcoforestApi("http://127.0.0.1")
+    await target.aclose()
+    assert target._client.is_closed
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_request_is_retried_with_backoff():
+    """Connection errors are retried until the request succeeds."""
+    target = EcoforestApi(
+        "http://127.0.0.1", retry=RetryPolicy(attempts=3, base_delay=0)
+    )
+    route = respx.post(path=URL_CGI).mock(
+        side_effect=[
+            httpx.TimeoutException("timeout"),
+            httpx.Response(500),
+            httpx.Response(200, text=load_fixture("op-1002-status.txt")),
+        ]
+    )
+    assert (await target.status())["estado"] == "0"
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_request_is_not_retried_on_authentication_errors():
+    """Authentication errors are raised without retrying."""
+    target = EcoforestApi("http://127.0.0.1", retry=RetryPolicy(base_delay=0))
+    route = respx.post(path=URL_CGI).mock(return_value=httpx.Response(401))
+    with pytest.raises(EcoforestAuthenticationRequired):
+        await target.status()
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_circuit_breaker_fails_fast():
+    """Requests fail fast once the device is known to be down."""
+    target = EcoforestApi(
+        "http://127.0.0.1",
+        retry=RetryPolicy(attempts=5, base_delay=0),
+        circuit_breaker=CircuitBreaker(failure_threshold=2),
     )
+    route = respx.post(path=URL_CGI).mock(side_effect=httpx.TimeoutException("timeout"))
+    with pytest.raises(EcoforestCircuitOpenError):
+        await target.status()
+    assert route.call_count == 2
+    with pytest.raises(EcoforestCircuitOpenError):
+        await target.get()
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_time_budget():
+    """Get gives up once its time budget is exceeded."""
+    target = EcoforestApi("http://127.0.0.1", budget=0.01)
+    side_effect, _ = _slow_device(1)
+    respx.post(path=URL_CGI).mock(side_effect=side_effect)
+    with pytest.raises(EcoforestConnectionError) as err:
+        await target.get()
+    assert str(err.value) == "Time budget exceeded while polling the device."
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_request_metrics():
+    """Every request reports its metrics to the recorder."""
+    metrics = InMemoryMetrics()
+    target = EcoforestApi("http://127.0.0.1", metrics=metrics)
+    _mock_reads()
+    respx.post(
+        path=URL_CGI, data={"idOperacion": API_SET_POWER_OP, "potencia": 5}
+    ).mock(side_effect=httpx.ConnectError("refused"))
+
+    await target.get()
+    with pytest.raises(EcoforestConnectionError):
+        await target._write(API_SET_POWER_OP, "potencia", 5)
+
+    stats = metrics.get("http://127.0.0.1", API_STATS_OP)
+    assert stats.total.count == 1
+    assert stats.parse.count == 1
+    assert stats.payload_size == len(load_fixture("op-1020-stats.txt"))
+    assert metrics.get("http://127.0.0.1", API_SET_POWER_OP).errors == {
+        "ConnectError": 1
+    }
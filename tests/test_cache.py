@@ -0,0 +1,30 @@
+from pyecoforest.cache import CacheInfo, ResponseCache
+
+
+def test_cache_expires_entries(clock):
+    cache = ResponseCache({1020: 10}, clock=clock)
+    assert cache.get(1020) is None
+    cache.set(1020, {"Me": "CC2014_v2"})
+    clock.now = 9.9
+    assert cache.get(1020) == {"Me": "CC2014_v2"}
+    clock.now = 10
+    assert cache.get(1020) is None
+    assert cache.info == CacheInfo(hits=1, misses=2, size=1)
+
+
+def test_cache_ignores_operations_without_ttl():
+    cache = ResponseCache({1020: 10})
+    cache.set(1002, {"estado": "0"})
+    assert cache.get(1002) is None
+    assert cache.info == CacheInfo(hits=0, misses=0, size=0)
+
+
+def test_cache_invalidate():
+    cache = ResponseCache({1002: 10, 1020: 10})
+    cache.set(1002, {"estado": "0"})
+    cache.set(1020, {"Me": "CC2014_v2"})
+    cache.invalidate(1002)
+    assert cache.get(1002) is None
+    assert cache.get(1020) is not None
+    cache.invalidate()
+    assert cache.info.size == 0
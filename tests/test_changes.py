@@ -0,0 +1,111 @@
+import copy
+
+import httpx
+import pytest
+import respx
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.changes import ChangeDetector, FieldChange, watch
+from pyecoforest.const import API_ALARMS_OP, API_STATS_OP, API_STATUS_OP, URL_CGI
+from pyecoforest.models.device import (
+    COMMON_FIELDS,
+    MODEL_SCHEMAS,
+    Alarm,
+    ModelSchema,
+    State,
+    register_model,
+)
+from pyecoforest.parser import parse
+
+from .conftest import load_fixture_bytes
+
+
+def _data() -> dict[str, dict[str, str]]:
+    return {
+        "status": parse(load_fixture_bytes("op-1002-status.txt")),
+        "stats": parse(load_fixture_bytes("op-1020-stats.txt")),
+        "alarms": parse(load_fixture_bytes("op-1079-alarms.txt")),
+    }
+
+
+def test_first_reading_reports_every_field():
+    changes = ChangeDetector().update(_data())
+    assert changes.device.serial_number == "000025568680000"
+    assert changes.changes["state"] == FieldChange(None, State.OFF)
+    assert len(changes.changes) == 28
+
+
+def test_unchanged_readings_are_skipped():
+    detector = ChangeDetector()
+    detector.update(_data())
+    assert detector.update(_data()) is None
+    data = _data()
+    # keys not read by the model don't report changes
+    data["stats"]["Am"] = "1.000"
+    assert detector.update(data) is None
+
+
+def test_changed_fields_are_reported():
+    detector = ChangeDetector()
+    detector.update(_data())
+    data = _data()
+    data["status"]["estado"] = "1"
+    data["alarms"]["get_alarmas"] = "A099"
+    changes = detector.update(data)
+    assert changes.device.state == State.STARTING
+    assert changes.changes == {
+        "state": FieldChange(State.OFF, State.STARTING),
+        "alarm": FieldChange(None, Alarm.PELLETS),
+        "alarm_code": FieldChange(None, "A099"),
+    }
+
+
+def test_changes_of_registered_models_are_reported():
+    fields = {**COMMON_FIELDS, "ambient_temperature": ("status", "ambiente", float)}
+    register_model("custom-model", ModelSchema("Custom", fields))
+    try:
+        detector = ChangeDetector()
+        data = _data()
+        data["stats"]["Me"] = "custom-model"
+        data["status"]["ambiente"] = "19.5"
+        detector.update(data)
+        data = copy.deepcopy(data)
+        data["status"]["ambiente"] = "25.0"
+        changes = detector.update(data)
+        assert changes.changes == {"ambient_temperature": FieldChange(19.5, 25.0)}
+    finally:
+        del MODEL_SCHEMAS["custom-model"]
+
+
+def test_deadbands_are_applied_against_reported_values():
+    detector = ChangeDetector({"live_pulse": 1.0})
+    detector.update(_data())
+    data = copy.deepcopy(_data())
+    data["stats"]["Pn"] = "0.6"
+    assert detector.update(data) is None
+    data = copy.deepcopy(data)
+    data["stats"]["Pn"] = "1.2"
+    changes = detector.update(data)
+    assert changes.changes == {"live_pulse": FieldChange(0.0, 1.2)}
+    # fields without deadband report any change
+    data = copy.deepcopy(data)
+    data["stats"]["Tn"] = "25.1"
+    assert detector.update(data).changes == {"ntc_temperature": FieldChange(25.0, 25.1)}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_watch():
+    for op, name in [
+        (API_STATUS_OP, "op-1002-status.txt"),
+        (API_STATS_OP, "op-1020-stats.txt"),
+        (API_ALARMS_OP, "op-1079-alarms.txt"),
+    ]:
+        respx.post(path=URL_CGI, data={"idOperacion": op}).mock(
+            return_value=httpx.Response(200, content=load_fixture_bytes(name))
+        )
+
+    async with EcoforestApi("http://127.0.0.1") as api:
+        async for changes in watch(api, 0):
+            assert changes.device.state == State.OFF
+            break
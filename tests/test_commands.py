@@ -0,0 +1,95 @@
+import asyncio
+from collections import Counter
+from urllib.parse import parse_qsl
+
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.commands import CommandQueue
+from pyecoforest.const import API_SET_POWER_OP, API_SET_STATE_OP, API_SET_TEMP_OP
+from pyecoforest.exceptions import (
+    EcoforestCommandExpiredError,
+    EcoforestConnectionError,
+)
+from pyecoforest.simulator import SimulatedStove, SimulatorTransport
+
+
+class CountingTransport(SimulatorTransport):
+    def __init__(self, stoves):
+        super().__init__(stoves)
+        self.operations = Counter()
+
+    async def handle_async_request(self, request):
+        form = dict(parse_qsl((await request.aread()).decode()))
+        self.operations[int(form["idOperacion"])] += 1
+        return await super().handle_async_request(request)
+
+
+def _queue(**kwargs) -> tuple[CommandQueue, SimulatedStove, CountingTransport]:
+    stove = SimulatedStove()
+    transport = CountingTransport({"stove": stove})
+    api = EcoforestApi("http://stove", client=httpx.AsyncClient(transport=transport))
+    return CommandQueue(api, **kwargs), stove, transport
+
+
+@pytest.mark.asyncio
+async def test_burst_is_merged_last_writer_wins():
+    queue, stove, transport = _queue(delay=0.01)
+    devices = await asyncio.gather(
+        queue.set_temperature(20),
+        queue.set_power(2),
+        queue.set_temperature(21.5),
+        queue.set_power(4),
+        queue.turn(True),
+    )
+    assert all(device == devices[0] for device in devices)
+    assert (devices[0].temperature, devices[0].power, devices[0].on) == (21.5, 4, True)
+    assert (stove.temperature, stove.power, stove.on) == (21.5, 4, True)
+    writes = [API_SET_POWER_OP, API_SET_TEMP_OP, API_SET_STATE_OP]
+    assert [transport.operations[op] for op in writes] == [1, 1, 1]
+    # a single refresh for the whole burst
+    assert sum(transport.operations.values()) == 6
+
+
+@pytest.mark.asyncio
+async def test_commands_sent_during_a_batch_go_to_the_next_one():
+    queue, _, transport = _queue(delay=0.01)
+    first = asyncio.create_task(queue.set_power(2))
+    await asyncio.sleep(0.02)
+    second = asyncio.create_task(queue.set_power(5))
+    await asyncio.sleep(0)
+    assert queue.pending == {"power": 5}
+    assert (await first).power == 2
+    assert (await second).power == 5
+    assert transport.operations[API_SET_POWER_OP] == 2
+    assert queue.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_stale_commands_expire(clock):
+    queue, stove, transport = _queue(delay=0.01, timeout=5, clock=clock)
+    command = asyncio.create_task(queue.set_power(5))
+    await asyncio.sleep(0)
+    clock.now = 5
+    with pytest.raises(EcoforestCommandExpiredError):
+        await command
+    assert transport.operations[API_SET_POWER_OP] == 0
+    assert stove.power == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    queue, _, transport = _queue(delay=0.01)
+    transport.stoves.clear()
+    results = await asyncio.gather(
+        queue.set_power(5), queue.turn(True), return_exceptions=True
+    )
+    assert all(isinstance(r, EcoforestConnectionError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_submit_requires_a_setpoint():
+    queue, _, _ = _queue()
+    with pytest.raises(ValueError):
+        await queue.submit()
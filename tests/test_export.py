@@ -0,0 +1,148 @@
+import asyncio
+import csv
+
+import pytest
+
+from pyecoforest.exceptions import EcoforestError
+from pyecoforest.export import (
+    SCHEMA,
+    ColumnarWriter,
+    CsvWriter,
+    DeviceExporter,
+    create_writer,
+)
+from pyecoforest.fleet import FleetResult
+
+from .conftest import make_device
+
+
+class MemoryWriter(ColumnarWriter):
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, columns):
+        self.batches.append(columns)
+
+    def close(self):
+        self.closed = True
+
+
+def test_exporter_writes_full_batches(clock):
+    writer = MemoryWriter()
+    with DeviceExporter(writer, batch_size=2, clock=clock) as exporter:
+        for i in range(5):
+            exporter.add("stove", make_device(power=i), timestamp=i)
+        assert len(exporter) == 1
+    assert writer.closed
+    assert [batch["power"] for batch in writer.batches] == [[0, 1], [2, 3], [4]]
+    batch = writer.batches[0]
+    assert list(batch) == list(SCHEMA)
+    assert batch["host"] == ["stove", "stove"]
+    assert batch["timestamp"] == [0, 1]
+    assert batch["state"] == ["on", "on"]
+    assert batch["alarm"] == ["pellets", "pellets"]
+
+
+def test_exporter_flushes_periodically(clock):
+    writer = MemoryWriter()
+    exporter = DeviceExporter(writer, flush_interval=10, clock=clock)
+    exporter.add("stove", make_device())
+    assert writer.batches == []
+    clock.now = 10
+    exporter.add("stove", make_device())
+    assert writer.batches[0]["timestamp"] == [0, 10]
+    assert len(exporter) == 0
+
+
+@pytest.mark.asyncio
+async def test_exporter_export_skips_errors():
+    async def results():
+        yield FleetResult("a", device=make_device())
+        yield FleetResult("b", error=EcoforestError("boom"))
+
+    writer = MemoryWriter()
+    with DeviceExporter(writer) as exporter:
+        await exporter.export(results())
+    assert writer.batches[0]["host"] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_exporter_export_flushes_while_quiet():
+    writer = MemoryWriter()
+    quiet = asyncio.Event()
+
+    async def results():
+        yield FleetResult("a", device=make_device())
+        # the device goes quiet, its reading is written once due anyway
+        await quiet.wait()
+
+    with DeviceExporter(writer, flush_interval=0.01) as exporter:
+        export = asyncio.create_task(exporter.export(results()))
+        while not writer.batches:
+            await asyncio.sleep(0.01)
+        assert writer.batches[0]["host"] == ["a"]
+        export.cancel()
+
+
+def test_columnar_writer_is_abstract():
+    with pytest.raises(TypeError):
+        ColumnarWriter()
+
+
+def test_csv_writer_appends(tmp_path):
+    path = tmp_path / "readings.csv"
+    for power in (1, 2):
+        with DeviceExporter(path) as exporter:
+            exporter.add("stove", make_device(power=power, alarm=None), timestamp=1.5)
+
+    with path.open(newline="") as exported:
+        rows = list(csv.DictReader(exported))
+    assert [row["power"] for row in rows] == ["1", "2"]
+    assert rows[0]["on"] == "1"
+    assert rows[0]["alarm"] == ""
+    assert rows[0]["operation_mode"] == "power"
+
+
+def test_csv_writer_rejects_other_schema(tmp_path):
+    path = tmp_path / "readings.csv"
+    path.write_text("host,power\n")
+    with pytest.raises(EcoforestError):
+        CsvWriter(path)
+
+
+def test_create_writer_rejects_unknown_format(tmp_path):
+    with pytest.raises(EcoforestError):
+        create_writer(tmp_path / "readings.json")
+
+
+def test_parquet_writer(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "readings.parquet"
+    with DeviceExporter(path, batch_size=2) as exporter:
+        for i in range(3):
+            exporter.add("stove", make_device(power=i), timestamp=i)
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.num_row_groups == 2
+    table = parquet.read()
+    assert table.column_names == list(SCHEMA)
+    assert table.column("power").to_pylist() == [0, 1, 2]
+    assert table.column("state").to_pylist() == ["on"] * 3
+
+
+def test_parquet_writer_never_overwrites(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "readings.parquet"
+    for power in (1, 2, 3):
+        with DeviceExporter(path) as exporter:
+            exporter.add("stove", make_device(power=power), timestamp=power)
+
+    parts = [
+        path,
+        tmp_path / "readings-0001.parquet",
+        tmp_path / "readings-0002.parquet",
+    ]
+    assert sorted(tmp_path.iterdir()) == sorted(parts)
+    powers = [pq.read_table(part).column("power").to_pylist() for part in parts]
+    assert powers == [[1], [2], [3]]
@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from pyecoforest.const import API_ALARMS_OP, API_STATS_OP, API_STATUS_OP, URL_CGI
+from pyecoforest.exceptions import EcoforestConnectionError
+from pyecoforest.fleet import EcoforestFleet
+
+from .conftest import load_fixture
+
+FIXTURES = {
+    str(API_STATUS_OP): "op-1002-status.txt",
+    str(API_STATS_OP): "op-1020-stats.txt",
+    str(API_ALARMS_OP): "op-1079-alarms.txt",
+}
+
+
+def _device(delay: float = 0):
+    async def side_effect(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        op = request.content.decode().split("=")[1]
+        return httpx.Response(200, text=load_fixture(FIXTURES[op]))
+
+    return side_effect
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_poll_yields_results_as_they_complete():
+    respx.post(f"http://slow{URL_CGI}").mock(side_effect=_device(0.05))
+    respx.post(f"http://fast{URL_CGI}").mock(side_effect=_device())
+    respx.post(f"http://dead{URL_CGI}").mock(
+        side_effect=httpx.TimeoutException("timeout")
+    )
+
+    async with EcoforestFleet(
+        {"http://slow": None, "http://fast": None, "http://dead": None}
+    ) as fleet:
+        results = [result async for result in fleet.poll()]
+
+    assert [result.host for result in results][-1] == "http://slow"
+    by_host = {result.host: result for result in results}
+    assert by_host["http://fast"].device.serial_number == "000025568680000"
+    assert by_host["http://slow"].device.serial_number == "000025568680000"
+    assert by_host["http://dead"].device is None
+    assert isinstance(by_host["http://dead"].error, EcoforestConnectionError)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_poll_all_is_bounded_by_max_concurrency():
+    in_flight = {"current": 0, "peak": 0}
+
+    async def side_effect(request: httpx.Request) -> httpx.Response:
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        response = await _device(0.01)(request)
+        in_flight["current"] -= 1
+        return response
+
+    respx.post(url__regex=rf"http://stove-\d+{URL_CGI}").mock(side_effect=side_effect)
+    hosts = {f"http://stove-{i}": httpx.BasicAuth("u", "p") for i in range(6)}
+
+    async with EcoforestFleet(
+        hosts, max_concurrency=2, max_concurrency_per_host=1
+    ) as fleet:
+        results = await fleet.poll_all()
+        assert fleet.hosts == list(hosts)
+        assert fleet.api("http://stove-0") is not None
+
+    assert set(results) == set(hosts)
+    assert all(result.error is None for result in results.values())
+    assert in_flight["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_hosts_share_clients_by_group():
+    async with EcoforestFleet(dict.fromkeys(["http://a", "http://b"])) as fleet:
+        assert fleet.api("http://a")._client is fleet.api("http://b")._client
+
+    fleet = EcoforestFleet(
+        dict.fromkeys(["http://a", "http://b", "http://c"]), hosts_per_client=2
+    )
+    assert fleet.api("http://a")._client is fleet.api("http://b")._client
+    assert fleet.api("http://a")._client is not fleet.api("http://c")._client
+    await fleet.aclose()
+    assert fleet.api("http://c")._client.is_closed
+
+    client = httpx.AsyncClient()
+    async with EcoforestFleet(
+        dict.fromkeys(["http://a", "http://b"]), client=client
+    ) as fleet:
+        assert fleet.api("http://a")._client is client
+    assert not client.is_closed
+    await client.aclose()
@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from pyecoforest.history import DeviceHistory, WindowStats
+
+from .conftest import make_device
+
+
+def test_history_ring_buffer():
+    history = DeviceHistory(capacity=3, columns=["gas_temperature"])
+    for i in range(5):
+        history.append(make_device(gas_temperature=float(i)), timestamp=i)
+    assert len(history) == 3
+    assert history.columns == ["gas_temperature"]
+    assert list(history.timestamps()) == [2, 3, 4]
+    assert list(history.column("gas_temperature")) == [2, 3, 4]
+
+
+def test_history_stats():
+    history = DeviceHistory()
+    for i, value in enumerate([100, 120, 90, 150]):
+        history.append(make_device(gas_temperature=value), timestamp=i * 10)
+
+    assert history.stats("gas_temperature") == WindowStats(
+        count=4, minimum=90, maximum=150, mean=115, rate=50 / 30
+    )
+    assert history.stats("gas_temperature", seconds=10, now=30) == WindowStats(
+        count=2, minimum=90, maximum=150, mean=120, rate=6
+    )
+
+
+def test_history_stats_skip_missing_readings():
+    history = DeviceHistory()
+    assert history.stats("live_pulse") is None
+    history.append(make_device(live_pulse=None), timestamp=0)
+    assert math.isnan(history.column("live_pulse")[0])
+    assert history.stats("live_pulse") is None
+    history.append(make_device(live_pulse=2.0), timestamp=1)
+    assert history.stats("live_pulse") == WindowStats(
+        count=1, minimum=2, maximum=2, mean=2, rate=0
+    )
+
+
+def test_history_invalid_arguments():
+    with pytest.raises(ValueError, match="capacity"):
+        DeviceHistory(capacity=0)
+    with pytest.raises(ValueError, match="not numeric"):
+        DeviceHistory(columns=["state"])
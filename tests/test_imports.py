@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import pyecoforest
+
+
+def _loaded_after_import(module: str) -> set[str]:
+    """Return the modules loaded by importing a module in a fresh interpreter."""
+    code = f"import sys; import {module}; print(' '.join(sys.modules))"
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(Path(pyecoforest.__file__).parents[1])},
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "pyecoforest.models.device",
+        "pyecoforest.exceptions",
+        "pyecoforest.const",
+        "pyecoforest.parser",
+    ],
+)
+def test_import_without_httpx(module):
+    assert "httpx" not in _loaded_after_import(module)
+
+
+def test_ssl_contexts_are_created_on_first_access():
+    import pyecoforest.ssl
+
+    pyecoforest.ssl.__dict__.pop("SSL_CONTEXT", None)
+    assert "SSL_CONTEXT" not in vars(pyecoforest.ssl)
+    context = pyecoforest.ssl.SSL_CONTEXT
+    assert pyecoforest.ssl.SSL_CONTEXT is context
+    with pytest.raises(AttributeError):
+        pyecoforest.ssl.UNKNOWN  # noqa: B018
+
+
+def test_lazy_constants():
+    import httpx
+
+    from pyecoforest import const, exceptions
+
+    assert isinstance(const.LOCAL_TIMEOUT, httpx.Timeout)
+    assert const.LOCAL_LIMITS.max_connections == 3
+    assert httpx.HTTPError in exceptions.ENDPOINT_PROBE_EXCEPTIONS
+    with pytest.raises(AttributeError):
+        const.UNKNOWN  # noqa: B018
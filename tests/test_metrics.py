@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from pyecoforest.exceptions import EcoforestConnectionError
+from pyecoforest.metrics import (
+    Histogram,
+    InMemoryMetrics,
+    MetricsRecorder,
+    RequestMetrics,
+    RequestTimer,
+)
+
+
+def test_histogram():
+    histogram = Histogram(buckets=[0.1, 1, 10])
+    for value in [0.05, 0.5, 0.7, 5, 50]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.count == 5
+    assert histogram.mean == pytest.approx(56.25 / 5)
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.8) == 10
+    assert histogram.quantile(1) == math.inf
+    assert Histogram().quantile(0.5) == 0
+    assert Histogram().mean == 0
+
+
+def test_metrics_recorder_is_abstract():
+    with pytest.raises(TypeError):
+        MetricsRecorder()
+
+
+@pytest.mark.asyncio
+async def test_request_timer():
+    timer = RequestTimer()
+    await timer.trace("connection.connect_tcp.started", {})
+    await timer.trace("connection.connect_tcp.complete", {})
+    await timer.trace("connection.start_tls.complete", {})
+    await timer.trace("http11.receive_response_headers.complete", {})
+    metrics = timer.metrics("http://stove", 1002, TimeoutError())
+    assert (timer.connections, timer.tls_handshakes) == (1, 1)
+    assert 0 <= metrics.connect <= metrics.first_byte <= metrics.total
+    assert metrics.error == "TimeoutError"
+
+    # the error the library error was raised from
+    try:
+        raise EcoforestConnectionError("Timeout") from TimeoutError()
+    except EcoforestConnectionError as error:
+        assert RequestTimer().metrics("h", 1002, error).error == "TimeoutError"
+
+    reused = RequestTimer().metrics("http://stove", 1002)
+    assert (reused.connect, reused.first_byte, reused.error) == (None, None, None)
+
+
+def test_in_memory_metrics():
+    metrics = InMemoryMetrics()
+    metrics.record(RequestMetrics("h", 1002, 0.01, 0.2, 0.3, 100, 0.001))
+    metrics.record(RequestMetrics("h", 1002, None, None, 0.5, error="Timeout"))
+    metrics.record(RequestMetrics("h", 1020, None, 0.2, 0.3, 500, 0.002))
+
+    status = metrics.get("h", 1002)
+    assert status.total.count == 2
+    assert status.connect.count == 1
+    assert status.first_byte.count == 1
+    assert status.parse.count == 1
+    assert status.payload_size == 100
+    assert status.errors == {"Timeout": 1}
+    assert [key for key, _ in metrics.items()] == [("h", 1002), ("h", 1020)]
+
+    # reading an operation never recorded doesn't add it
+    assert metrics.get("h", 1004).total.count == 0
+    assert [key for key, _ in metrics.items()] == [("h", 1002), ("h", 1020)]
@@ -1,7 +1,21 @@
+import copy
+import dataclasses
+import pickle
+
 import pytest
 
 from pyecoforest.exceptions import EcoforestError
-from pyecoforest.models.device import Alarm, Device, OperationMode, State
+from pyecoforest.models.device import (
+    COMMON_FIELDS,
+    MODEL_SCHEMAS,
+    Alarm,
+    Device,
+    LazyDevice,
+    ModelSchema,
+    OperationMode,
+    State,
+    register_model,
+)
 
 
 def get_api_data():
@@ -103,3 +117,114 @@ def test_device_build_with_supportted_device():
     data = get_api_data()
     data["stats"]["Me"] = "CC2014_v2"
     assert Device.build(data).is_supported is True
+
+
+def test_device_is_slotted():
+    device = Device.build(get_api_data())
+    assert not hasattr(device, "__dict__")
+    with pytest.raises(AttributeError):
+        device.unknown = 1
+
+
+def test_lazy_device_parses_fields_on_first_access():
+    device = LazyDevice.build(get_api_data())
+    assert device.state == State.OFF
+    assert device.alarm == Alarm.PELLETS
+    device._data["status"]["estado"] = "7"
+    # parsed fields are cached, the others are still pending
+    assert device.state == State.OFF
+    assert device.power == 6
+    assert not hasattr(device, "__dict__")
+
+
+def test_lazy_device_equals_device():
+    data = get_api_data()
+    assert LazyDevice.build(data) == Device.build(data)
+    assert Device.build(data) == LazyDevice.build(data)
+    data["status"]["consigna_potencia"] = "5"
+    assert LazyDevice.build(data) != Device.build(get_api_data())
+    assert isinstance(LazyDevice.build(data), Device)
+
+
+def test_lazy_device_reports_invalid_fields_on_access():
+    data = get_api_data()
+    data["status"]["estado"] = "9"
+    device = LazyDevice.build(data)
+    assert device.on is False
+    with pytest.raises(EcoforestError):
+        getattr(device, "state")  # noqa: B009
+    with pytest.raises(AttributeError):
+        getattr(device, "unknown")  # noqa: B009
+
+
+@pytest.mark.parametrize(
+    "duplicate",
+    [
+        copy.copy,
+        copy.deepcopy,
+        lambda device: pickle.loads(pickle.dumps(device)),  # noqa: S301
+    ],
+    ids=["copy", "deepcopy", "pickle"],
+)
+def test_lazy_device_round_trip(duplicate):
+    device = LazyDevice.build(get_api_data())
+    assert device.state == State.OFF
+    duplicated = duplicate(device)
+    assert isinstance(duplicated, LazyDevice)
+    assert duplicated.state == State.OFF
+    assert duplicated == Device.build(get_api_data())
+
+
+def test_lazy_device_replace():
+    device = LazyDevice.build(get_api_data())
+    replaced = dataclasses.replace(device, power=3)
+    assert type(replaced) is Device
+    assert replaced == dataclasses.replace(Device.build(get_api_data()), power=3)
+    assert device.power == 6
+
+
+def test_device_build_with_model_extra_fields():
+    data = get_api_data()
+    data["stats"].update(Me="CC2014_v2", Ta="24.1", Dp="144.2", Pa="-0.7", Rt="-30")
+    device = Device.build(data)
+    assert device.ambient_temperature == 24.1
+    assert device.differential_pressure == 144.2
+    assert device.pressure == -0.7
+    assert device.return_temperature == -30.0
+    assert LazyDevice.build(data) == device
+
+
+def test_device_build_ignores_extra_fields_of_unknown_models():
+    data = get_api_data()
+    data["stats"]["Ta"] = "24.1"
+    device = Device.build(data)
+    assert device.is_supported is False
+    assert device.ambient_temperature is None
+    assert LazyDevice.build(data).ambient_temperature is None
+
+
+def test_register_model():
+    fields = {**COMMON_FIELDS, "ambient_temperature": ("status", "ambiente", float)}
+    register_model("model-version", ModelSchema("Custom", fields))
+    try:
+        data = get_api_data()
+        data["status"]["ambiente"] = "19.5"
+        device = Device.build(data)
+        assert device.is_supported is True
+        assert device.model_name == "Custom"
+        assert device.ambient_temperature == 19.5
+        assert LazyDevice.build(data) == device
+    finally:
+        del MODEL_SCHEMAS["model-version"]
+    assert Device.build(get_api_data()).is_supported is False
+
+
+def test_register_model_with_invalid_field():
+    register_model(
+        "model-version", ModelSchema("Custom", {"unknown": ("stats", "Un", str)})
+    )
+    try:
+        with pytest.raises(EcoforestError):
+            Device.build(get_api_data())
+    finally:
+        del MODEL_SCHEMAS["model-version"]
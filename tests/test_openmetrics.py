@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.exceptions import EcoforestConnectionError
+from pyecoforest.fleet import FleetResult
+from pyecoforest.openmetrics import CONTENT_TYPE, MetricsExporter
+from pyecoforest.scheduler import PollScheduler
+from pyecoforest.simulator import SimulatedStove, SimulatorTransport
+
+from .conftest import FakeClock, make_device
+
+
+class CountingTransport(SimulatorTransport):
+    def __init__(self, stoves: dict[str, SimulatedStove]) -> None:
+        super().__init__(stoves)
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return await super().handle_async_request(request)
+
+
+def _exporter(clock: FakeClock) -> MetricsExporter:
+    scheduler = PollScheduler({}, min_interval=0.01)
+    return MetricsExporter(scheduler, port=0, clock=clock)
+
+
+def test_render_samples(clock):
+    exporter = _exporter(clock)
+    clock.now = 10
+    device = make_device(model_name='Cordoba "glass"', gas_temperature=100.5)
+    exporter.update(FleetResult("stove", device))
+    lines = exporter.render().decode().splitlines()
+
+    assert 'ecoforest_up{host="stove"} 1' in lines
+    assert 'ecoforest_last_poll_timestamp_seconds{host="stove"} 10' in lines
+    assert (
+        'ecoforest_device_info{host="stove",serial_number="serial-number",'
+        'model="CC2014_v2",model_name="Cordoba \\"glass\\"",'
+        'firmware="firmware-version"} 1'
+    ) in lines
+    assert 'ecoforest_on{host="stove"} 1.0' in lines
+    assert 'ecoforest_gas_temperature{host="stove"} 100.5' in lines
+    assert 'ecoforest_state{host="stove",ecoforest_state="on"} 1' in lines
+    assert 'ecoforest_state{host="stove",ecoforest_state="off"} 0' in lines
+    assert (
+        'ecoforest_operation_mode{host="stove",ecoforest_operation_mode="power"} 1'
+    ) in lines
+    assert 'ecoforest_alarm{host="stove",ecoforest_alarm="pellets"} 1' in lines
+    # fields the device didn't report have no sample
+    assert not [line for line in lines if line.startswith("ecoforest_pressure{")]
+    assert lines[-1] == "# EOF"
+
+
+def test_render_keeps_last_device_on_failed_poll(clock):
+    exporter = _exporter(clock)
+    exporter.update(FleetResult("stove", make_device()))
+    clock.now = 20
+    exporter.update(FleetResult("stove", error=EcoforestConnectionError()))
+    exporter.update(FleetResult("other", error=EcoforestConnectionError()))
+    lines = exporter.render().decode().splitlines()
+
+    assert 'ecoforest_up{host="stove"} 0' in lines
+    assert 'ecoforest_up{host="other"} 0' in lines
+    assert 'ecoforest_last_poll_timestamp_seconds{host="stove"} 20' in lines
+    assert 'ecoforest_power{host="stove"} 5.0' in lines
+    assert not [line for line in lines if 'host="other"' in line and "info" in line]
+
+
+def test_render_is_cached_until_update(clock):
+    exporter = _exporter(clock)
+    exporter.update(FleetResult("stove", make_device()))
+    rendered = exporter.render()
+    assert exporter.render() is rendered
+
+    exporter.update(FleetResult("stove", make_device(power=7)))
+    assert exporter.render() is not rendered
+    assert b'ecoforest_power{host="stove"} 7.0' in exporter.render()
+
+
+@pytest.mark.asyncio
+async def test_scrapes_are_served_without_device_requests():
+    stoves = {f"stove-{i}": SimulatedStove(f"{i:015d}") for i in range(3)}
+    transport = CountingTransport(stoves)
+    client = httpx.AsyncClient(transport=transport)
+    apis = {host: EcoforestApi(f"http://{host}", client=client) for host in stoves}
+    scheduler = PollScheduler(apis, min_interval=0.01, jitter=0)
+
+    async with MetricsExporter(
+        scheduler, port=0
+    ) as exporter, httpx.AsyncClient() as web:
+        while len(exporter.render().split(b"ecoforest_device_info{")) < 4:
+            await asyncio.sleep(0.01)
+        requests = transport.requests
+        for _ in range(5):
+            response = await web.get(exporter.url)
+            assert response.status_code == 200
+            assert response.headers["content-type"] == CONTENT_TYPE
+            assert 'serial_number="000000000000002"' in response.text
+            assert response.text.endswith("# EOF\n")
+        assert transport.requests == requests
+
+        response = await web.get(exporter.url.replace("/metrics", "/"))
+        assert response.status_code == 404
@@ -0,0 +1,34 @@
+from pyecoforest.parser import parse
+
+from .conftest import load_fixture_bytes
+
+
+def test_parse_stats():
+    actual = parse(load_fixture_bytes("op-1020-stats.txt"))
+    assert actual["error_get_menu2"] == "0"
+    assert actual["Me"] == "CC2014_v2"
+    assert actual["Vs"] == "30Abr19_v2z"
+    assert actual["Rt"] == "-30.0"
+    # the last line is not terminated and is discarded
+    assert "pC" not in actual
+    assert len(actual) == 23
+
+
+def test_parse_discards_lines_without_pairs():
+    assert parse(load_fixture_bytes("op-1004-set-power.txt")) == {
+        "error_set_potencia": "0"
+    }
+    assert parse(load_fixture_bytes("op-1013-set-state.txt")) == {}
+
+
+def test_parse_values_with_separator():
+    assert parse(b" a b=x=y\nc=\n0%") == {"ab": "x=y", "c": ""}
+
+
+def test_parse_only_requested_keys():
+    actual = parse(load_fixture_bytes("op-1002-status.txt"), keys={"estado", "on_off"})
+    assert actual == {"estado": "0", "on_off": "0"}
+
+
+def test_parse_with_encoding():
+    assert parse("a=Março\n".encode("latin-1"), "latin-1") == {"a": "Março"}
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi, Refresh
+from pyecoforest.const import (
+    API_ALARMS_OP,
+    API_SET_POWER_OP,
+    API_STATS_OP,
+    API_STATUS_OP,
+)
+from pyecoforest.exceptions import EcoforestConnectionError
+from pyecoforest.recording import (
+    Exchange,
+    RecordingTransport,
+    ReplayTransport,
+    read_exchanges,
+)
+from pyecoforest.simulator import SimulatedStove, SimulatorTransport
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", ["traffic.jsonl", "traffic.jsonl.gz"])
+async def test_record_and_replay(tmp_path, name, clock):
+    path = tmp_path / name
+    stove = SimulatedStove()
+    transport = RecordingTransport(
+        path, SimulatorTransport({"stove": stove}), clock=clock
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        api = EcoforestApi("http://stove", client=client)
+        recorded = await api.get()
+        await api.set_power(5, refresh=Refresh.NONE)
+
+    exchanges = list(read_exchanges(path))
+    assert sorted(exchange.operation for exchange in exchanges) == sorted(
+        [API_STATUS_OP, API_STATS_OP, API_ALARMS_OP, API_SET_POWER_OP]
+    )
+    assert {exchange.host for exchange in exchanges} == {"stove"}
+    assert all(exchange.status == 200 and exchange.reply for exchange in exchanges)
+    assert "potencia=5" in exchanges[-1].request
+
+    stove.power = 1
+    async with httpx.AsyncClient(transport=ReplayTransport(path, speed=None)) as client:
+        api = EcoforestApi("http://stove", client=client)
+        # the replies start over once every one was used
+        assert await api.get() == recorded
+        assert await api.get() == recorded
+
+
+@pytest.mark.asyncio
+async def test_replay_transport_errors(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    transport = RecordingTransport(path, httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(EcoforestConnectionError, match="Timeout"):
+            await EcoforestApi("http://stove", client=client).status()
+
+    (exchange,) = read_exchanges(path)
+    assert (exchange.operation, exchange.error) == (API_STATUS_OP, "ReadTimeout")
+
+    transport = ReplayTransport([exchange], speed=None)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(EcoforestConnectionError, match="Timeout"):
+            await EcoforestApi("http://stove", client=client).status()
+        # operations and hosts never recorded aren't found
+        with pytest.raises(EcoforestConnectionError):
+            await EcoforestApi("http://stove", client=client).stats()
+        with pytest.raises(EcoforestConnectionError):
+            await EcoforestApi("http://other", client=client).status()
+
+
+@pytest.mark.asyncio
+async def test_replay_speed():
+    exchange = Exchange("stove", API_ALARMS_OP, "", 200, "get_alarmas=\n", 0.0, 0.5)
+    transport = ReplayTransport([exchange], speed=50)
+    async with httpx.AsyncClient(transport=transport) as client:
+        api = EcoforestApi("http://stove", client=client)
+        started = time.perf_counter()
+        assert await api.alarms() == {"get_alarmas": ""}
+        assert 0.01 <= time.perf_counter() - started < 0.25
+
+    with pytest.raises(ValueError, match="positive"):
+        ReplayTransport([exchange], speed=0)
+
+
+@pytest.mark.asyncio
+async def test_record_only_finished_exchanges(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    started = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if b"idOperacion=1002" in request.content:
+            raise RuntimeError("not a transport error")
+        if b"idOperacion=1020" in request.content:
+            started.set()
+            await asyncio.sleep(10)
+        return httpx.Response(200, content=b"get_alarmas=\n")
+
+    transport = RecordingTransport(path, httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        api = EcoforestApi("http://stove", client=client)
+        with pytest.raises(RuntimeError):
+            await api.status()
+        task = asyncio.create_task(api.stats())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await api.alarms()
+
+        # every exchange is flushed once written
+        assert [e.operation for e in read_exchanges(path)] == [API_ALARMS_OP]
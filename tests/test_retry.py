@@ -0,0 +1,40 @@
+import pytest
+
+from pyecoforest.exceptions import EcoforestCircuitOpenError
+from pyecoforest.retry import CircuitBreaker, CircuitState, RetryPolicy
+
+
+def test_retry_delay_is_capped_exponential():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_retry_delay_is_jittered():
+    policy = RetryPolicy(base_delay=1, jitter=0.5)
+    for _ in range(20):
+        assert 0.5 <= policy.delay(1) <= 1
+
+
+def test_circuit_breaker_opens_over_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(EcoforestCircuitOpenError):
+        breaker.check()
+
+
+def test_circuit_breaker_half_open_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.check()
+    # a failed probe opens the circuit again
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    clock.now = 20
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
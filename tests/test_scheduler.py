@@ -0,0 +1,80 @@
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.const import LOCAL_LIMITS
+from pyecoforest.exceptions import EcoforestConnectionError
+from pyecoforest.models.device import Device, State
+from pyecoforest.scheduler import PollScheduler
+
+from .conftest import make_device
+
+# a stove that is turned off
+OFF = make_device(on=False, state=State.OFF)
+
+
+class FakeApi(EcoforestApi):
+    def __init__(self, readings: list[Device | Exception]) -> None:
+        super().__init__("http://127.0.0.1", client=httpx.AsyncClient())
+        self.readings = readings
+
+    async def get(self) -> Device:
+        reading = self.readings.pop(0) if len(self.readings) > 1 else self.readings[0]
+        if isinstance(reading, Exception):
+            raise reading
+        return reading
+
+
+def test_next_interval_by_state():
+    scheduler = PollScheduler({}, jitter=0)
+    assert scheduler.next_interval(None, OFF) == 300
+    assert scheduler.next_interval(OFF, OFF) == 300
+    assert scheduler.next_interval(None, make_device(state=State.STARTING)) == 10
+    assert scheduler.next_interval(None, make_device(state=State.ON)) == 60
+
+
+def test_next_interval_on_transition_and_movement():
+    scheduler = PollScheduler({}, jitter=0, min_interval=2)
+    on = make_device(state=State.ON)
+    assert scheduler.next_interval(OFF, on) == 2
+    assert scheduler.next_interval(on, make_device(state=State.ON)) == 60
+    hot = make_device(state=State.ON, gas_temperature=120)
+    assert scheduler.next_interval(on, hot) == 30
+
+
+def test_next_interval_is_clamped_and_jittered():
+    scheduler = PollScheduler(
+        {}, intervals={State.OFF: 1000}, max_interval=100, jitter=0.5
+    )
+    for _ in range(20):
+        assert 50 <= scheduler.next_interval(None, OFF) <= 150
+
+
+def test_idle_connections_outlast_the_longest_interval():
+    # steady state polls reuse the connections of the previous poll, even
+    # when the intervals are clamped to the default max_interval
+    for intervals in (None, dict.fromkeys(State, 3600)):
+        scheduler = PollScheduler({}, intervals=intervals)
+        for _ in range(20):
+            assert scheduler.next_interval(OFF, OFF) < LOCAL_LIMITS.keepalive_expiry
+
+
+@pytest.mark.asyncio
+async def test_run_yields_devices_and_errors():
+    api = FakeApi([EcoforestConnectionError("down"), OFF])
+    scheduler = PollScheduler(
+        {"http://stove": api},
+        intervals=dict.fromkeys(State, 0.01),
+        min_interval=0.001,
+        error_interval=0.001,
+    )
+    results = []
+    async for result in scheduler.run():
+        results.append(result)
+        if len(results) == 3:
+            break
+
+    assert isinstance(results[0].error, EcoforestConnectionError)
+    assert results[1].device == OFF
+    assert results[2].host == "http://stove"
+    await api.aclose()
@@ -0,0 +1,128 @@
+import httpx
+import pytest
+
+from pyecoforest.api import EcoforestApi
+from pyecoforest.exceptions import (
+    EcoforestAuthenticationRequired,
+    EcoforestConnectionError,
+)
+from pyecoforest.fleet import EcoforestFleet
+from pyecoforest.models.device import Device, State
+from pyecoforest.simulator import (
+    SimulatedStove,
+    SimulatorConfig,
+    SimulatorTransport,
+    StoveServer,
+    start_fleet,
+)
+
+
+def test_stove_state_machine(clock):
+    config = SimulatorConfig(
+        starting_time=10, pre_heating_time=20, shutting_down_time=5
+    )
+    stove = SimulatedStove(config=config, clock=clock)
+    assert stove.state == 0
+    stove.turn(True)
+    assert stove.state == 1
+    clock.now = 10
+    assert stove.state == 5
+    clock.now = 30
+    assert stove.state == 7
+    stove.turn(False)
+    assert stove.state == 8
+    clock.now = 35
+    assert stove.state == 0
+    stove.alarm = "A099"
+    assert stove.state == -4
+    assert stove.ignitions == 1153
+
+
+def test_stove_replies_are_parsed_into_a_device():
+    stove = SimulatedStove()
+    stove.handle({"idOperacion": "1004", "potencia": "5"})
+    stove.handle({"idOperacion": "1019", "temperatura": "22.5"})
+    stove.handle({"idOperacion": "1013", "on_off": "1"})
+    api = EcoforestApi("http://127.0.0.1")
+    device = Device.build(
+        {
+            "status": api._parse(stove.handle({"idOperacion": "1002"}).encode()),
+            "stats": api._parse(stove.handle({"idOperacion": "1020"}).encode()),
+            "alarms": api._parse(stove.handle({"idOperacion": "1079"}).encode()),
+        }
+    )
+    assert device.on is True
+    assert device.state == State.STARTING
+    assert (device.power, device.temperature) == (5, 22.5)
+    assert device.firmware == "30Abr19_v2z"
+    assert stove.handle({"idOperacion": "9999"}) == "0%"
+
+
+@pytest.mark.asyncio
+async def test_stove_server():
+    config = SimulatorConfig(username="admin", password="secret")  # noqa: S106
+    async with StoveServer(SimulatedStove(config=config)) as server:
+        async with EcoforestApi(
+            server.url, auth=httpx.BasicAuth("admin", "secret")
+        ) as api:
+            device = await api.set_power(5)
+            assert device.power == 5
+            assert device.serial_number == "000025568680000"
+            assert api.connection_stats.connections < api.connection_stats.requests
+
+        async with EcoforestApi(server.url) as api:
+            with pytest.raises(EcoforestAuthenticationRequired):
+                await api.get()
+
+
+@pytest.mark.asyncio
+async def test_stove_server_errors():
+    config = SimulatorConfig(error_rate=1)
+    async with StoveServer(SimulatedStove(config=config)) as server:
+        async with EcoforestApi(server.url) as api:
+            with pytest.raises(EcoforestConnectionError):
+                await api.get()
+
+    with pytest.raises(RuntimeError):
+        assert server.url
+
+
+@pytest.mark.asyncio
+async def test_start_fleet():
+    servers = await start_fleet(3)
+    try:
+        async with EcoforestFleet(dict.fromkeys(s.url for s in servers)) as fleet:
+            results = await fleet.poll_all()
+        assert {result.device.serial_number for result in results.values()} == {
+            "000000000000000",
+            "000000000000001",
+            "000000000000002",
+        }
+    finally:
+        for server in servers:
+            await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_simulator_transport():
+    config = SimulatorConfig(max_connections=1, min_latency=0.01, max_latency=0.01)
+    transport = SimulatorTransport(
+        {f"stove-{i}": SimulatedStove(f"{i}", config) for i in range(2)}
+    )
+    async with EcoforestFleet(
+        {"http://stove-0": None, "http://stove-1": None, "http://unknown": None},
+        client=httpx.AsyncClient(transport=transport),
+    ) as fleet:
+        results = await fleet.poll_all()
+
+    # the devices serve a single connection at once
+    assert isinstance(results["http://stove-0"].error, EcoforestConnectionError)
+    assert isinstance(results["http://unknown"].error, EcoforestConnectionError)
+
+    transport = SimulatorTransport({"stove-1": SimulatedStove("1", config)})
+    async with EcoforestApi(
+        "http://stove-1",
+        client=httpx.AsyncClient(transport=transport),
+        max_concurrency=1,
+    ) as api:
+        assert (await api.get()).serial_number == "1"
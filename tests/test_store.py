@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+
+from pyecoforest.exceptions import EcoforestError
+from pyecoforest.models.device import State
+from pyecoforest.store import SnapshotStore
+
+from .conftest import make_device
+
+
+def test_store_readings_round_trip(tmp_path):
+    path = tmp_path / "readings.db"
+    with SnapshotStore(path) as store:
+        store.add(make_device(), timestamp=10)
+        store.add(make_device(on=False, state=State.OFF, alarm=None), timestamp=20)
+        store.add(make_device(serial_number="other"), timestamp=15)
+
+    with SnapshotStore(path) as store:
+        assert store.serial_numbers() == ["other", "serial-number"]
+        readings = store.readings("serial-number")
+        assert readings == [
+            (10, make_device()),
+            (20, make_device(on=False, state=State.OFF, alarm=None)),
+        ]
+        assert readings[0][1].is_supported is True
+        assert store.readings("serial-number", start=11) == readings[1:]
+        assert store.readings("serial-number", end=10) == readings[:1]
+        assert store.readings("unknown") == []
+
+
+def test_store_versions_static_fields(tmp_path):
+    path = tmp_path / "readings.db"
+    with SnapshotStore(path) as store:
+        store.add(make_device(), timestamp=1)
+        store.add(make_device(firmware="new-firmware"), timestamp=2)
+    with SnapshotStore(path) as store:
+        store.add(make_device(firmware="new-firmware"), timestamp=3)
+        assert [d.firmware for _, d in store.readings("serial-number")] == [
+            "firmware-version",
+            "new-firmware",
+            "new-firmware",
+        ]
+
+
+def test_store_adds_new_columns(tmp_path):
+    path = tmp_path / "readings.db"
+    with SnapshotStore(path) as store:
+        store.add(make_device(), timestamp=1)
+        # a database created before the ignitions field existed
+        store._connection.execute('ALTER TABLE readings DROP COLUMN "ignitions"')
+    with SnapshotStore(path) as store:
+        store.add(make_device(), timestamp=2)
+        assert [d.ignitions for _, d in store.readings("serial-number")] == [None, 10]
+
+
+def test_store_rejects_unknown_schema(tmp_path):
+    path = tmp_path / "readings.db"
+    with SnapshotStore(path) as store:
+        store._connection.execute("PRAGMA user_version = 99")
+    with pytest.raises(EcoforestError, match="version 99"):
+        SnapshotStore(path)
+
+    path = tmp_path / "other.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE readings (timestamp REAL)")
+    connection.close()
+    with pytest.raises(EcoforestError, match="unknown schema"):
+        SnapshotStore(path)
+
+
+def test_store_downsample():
+    with SnapshotStore() as store:
+        store.add_many(
+            (make_device(gas_temperature=float(i), power=i % 2), i * 10)
+            for i in range(12)
+        )
+        assert store.downsample("serial-number", 60, ["gas_temperature", "power"]) == [
+            (0, {"gas_temperature": 2.5, "power": 0.5}),
+            (60, {"gas_temperature": 8.5, "power": 0.5}),
+        ]
+        assert store.downsample("serial-number", 60, ["power"], start=60) == [
+            (60, {"power": 0.5})
+        ]
+        with pytest.raises(ValueError):
+            store.downsample("serial-number", 60, ["state"])
+
+
+def test_store_delta():
+    with SnapshotStore() as store:
+        for day in range(5):
+            store.add(
+                make_device(working_hours=100 + day * 8, ignitions=10 + day),
+                timestamp=day * 86400,
+            )
+        assert store.delta("serial-number", "working_hours") == 32
+        assert store.delta("serial-number", "ignitions", start=86400) == 3
+        assert store.delta("unknown", "ignitions") is None
+        with pytest.raises(ValueError):
+            store.delta("serial-number", "model")
@@ -0,0 +1,62 @@
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyecoforest.api import EcoforestApi, Refresh
+from pyecoforest.models.device import State
+from pyecoforest.simulator import SimulatedStove, SimulatorConfig, StoveServer
+from pyecoforest.sync import BackgroundLoop, EcoforestSyncApi
+
+
+@pytest.fixture
+def loop():
+    loop = BackgroundLoop()
+    yield loop
+    loop.stop()
+
+
+@pytest.fixture
+def server(loop):
+    server = StoveServer(SimulatedStove(config=SimulatorConfig(max_latency=0.01)))
+    loop.run(server.start())
+    yield server
+    loop.run(server.stop())
+
+
+def test_sync_api(loop, server):
+    with EcoforestSyncApi(server.url, loop=loop) as api:
+        assert api.get().state == State.OFF
+        assert api.set_power(5).power == 5
+        assert api.set_temperature(21.5, refresh=Refresh.NONE).temperature == 21.5
+        assert api.turn(True).on is True
+        assert api.apply(on=False, power=2).power == 2
+
+
+@pytest.mark.parametrize(
+    "name", ["get", "turn", "set_temperature", "set_power", "apply"]
+)
+def test_sync_api_mirrors_async_api(name):
+    assert inspect.signature(getattr(EcoforestSyncApi, name)) == inspect.signature(
+        getattr(EcoforestApi, name)
+    )
+
+
+def test_sync_api_is_thread_safe(loop, server):
+    with EcoforestSyncApi(server.url, loop=loop) as api:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            devices = list(executor.map(lambda _: api.get(), range(40)))
+        assert all(device == devices[0] for device in devices)
+        # the connections are pooled across calls and threads
+        assert api.api.connection_stats.connections <= 3
+
+
+def test_sync_api_from_loop_thread(loop, server):
+    api = EcoforestSyncApi(server.url, loop=loop)
+
+    async def call():
+        return api.get()
+
+    with pytest.raises(RuntimeError):
+        loop.submit(call()).result()
+    api.close()